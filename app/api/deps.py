@@ -5,6 +5,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.database import get_db
 from app.services.auth_service import AuthService
+from app.services.device_management_service import DeviceService
+from app.services.firmware_service import FirmwareService
+from app.services.group_management_service import GroupService, GroupVulnerabilityService
+from app.services.messaging_service import NotificationService
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/token")
 
@@ -30,6 +34,26 @@ async def get_current_client(
 # For backward compatibility with existing code
 get_current_user = get_current_client
 
+async def get_device_service(db: AsyncSession = Depends(get_db)) -> DeviceService:
+    """Provide a DeviceService bound to the request's DB session"""
+    return DeviceService(db)
+
+async def get_firmware_service(db: AsyncSession = Depends(get_db)) -> FirmwareService:
+    """Provide a FirmwareService bound to the request's DB session"""
+    return FirmwareService(db)
+
+async def get_group_service(db: AsyncSession = Depends(get_db)) -> GroupService:
+    """Provide a GroupService bound to the request's DB session"""
+    return GroupService(db)
+
+async def get_group_vulnerability_service(db: AsyncSession = Depends(get_db)) -> GroupVulnerabilityService:
+    """Provide a GroupVulnerabilityService bound to the request's DB session"""
+    return GroupVulnerabilityService(db)
+
+async def get_notification_service(db: AsyncSession = Depends(get_db)) -> NotificationService:
+    """Provide a NotificationService bound to the request's DB session"""
+    return NotificationService(db)
+
 # Function to get client IP address
 async def get_client_ip(request: Request) -> str:
     """
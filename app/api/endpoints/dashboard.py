@@ -5,7 +5,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, desc, case, and_
 
-from app.models.database import get_db
+from app.models.database import execute_parallel, get_db
 from app.models.device import Device
 from app.models.activity import Activity
 from app.models.firmware import FirmwareUpdate
@@ -181,14 +181,6 @@ async def get_security_overview(
         func.sum(case((and_(Device.supports_tls == True, Device.tls_version < "TLS 1.2"), 1), else_=0)).label("tls_older")
     )
     
-    tls_result = await db.execute(tls_query)
-    tls_stats = tls_result.mappings().one()
-    
-    # Calculate TLS adoption rate
-    total_devices = tls_stats["total"] or 0
-    tls_enabled = tls_stats["tls_enabled"] or 0
-    tls_adoption_rate = (tls_enabled / total_devices * 100) if total_devices > 0 else 0
-    
     # Query for certificate status
     now = datetime.utcnow()
     cert_query = select(
@@ -198,21 +190,30 @@ async def get_security_overview(
         func.sum(case((Device.cert_expiry >= (now + timedelta(days=30)), 1), else_=0)).label("valid")
     ).where(Device.supports_tls == True)
     
-    cert_result = await db.execute(cert_query)
-    cert_stats = cert_result.mappings().one()
-    
     # Query for security rating distribution
     # This would require implementing a security rating calculation
     # For now, we'll use a placeholder distribution
     
     # Get devices with security issues (expired certs, low rating, etc.)
-    security_issues_query = select(Device).where(
+    security_issues_query = select(
+        Device.hash_id, Device.name, Device.cert_expiry, Device.updated_at
+    ).where(
         (Device.supports_tls == True) & 
         ((Device.cert_expiry < now) | (Device.cert_expiry == None))
     ).limit(5)
     
-    security_issues_result = await db.execute(security_issues_query)
-    devices_with_issues = security_issues_result.scalars().all()
+    # The three queries are independent, so they run concurrently on separate connections
+    tls_result, cert_result, security_issues_result = await execute_parallel(
+        tls_query, cert_query, security_issues_query
+    )
+    tls_stats = tls_result.mappings().one()
+    cert_stats = cert_result.mappings().one()
+    devices_with_issues = security_issues_result.all()
+    
+    # Calculate TLS adoption rate
+    total_devices = tls_stats["total"] or 0
+    tls_enabled = tls_stats["tls_enabled"] or 0
+    tls_adoption_rate = (tls_enabled / total_devices * 100) if total_devices > 0 else 0
     
     return {
         "tls_adoption": {
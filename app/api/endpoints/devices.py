@@ -1,26 +1,68 @@
 """Device API endpoints"""
 import logging
+import time
 from typing import List, Optional, Dict, Any
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Body, Path, Request, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Body, Path, Request, Response, BackgroundTasks
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, desc, func
+from sqlalchemy.orm import raiseload
 
 from app.api.deps import get_db, get_current_client
 from app.api.schemas import (
     DeviceBase, DeviceCreate, DeviceUpdate, DeviceInDB, DeviceStatusResponse,
     DeviceControlResponse, SensorReadingResponse, SensorSummaryResponse
 )
+from app.api.utils import iter_json_array, start_json_stream
 from app.models.client import Client
+from app.models.database import AsyncSessionLocal
 from app.models.device import Device
 from app.models.sensor_reading import SensorReading
 from app.services.device_management_service import DeviceService
+from app.services.group_management_service import invalidate_cached_groups, refresh_vulnerability_dashboard
 from app.services.security_service import VulnerabilityService
 from app.utils.vulnerability_utils import vulnerability_manager
+from app.utils.cache import TTLCache
 from app.core.logging import logger
 
 router = APIRouter()
 
+# Status payloads are polled on timers by dashboards; keep them for a second.
+# Endpoints here that change a device drop its entry right after the write.
+_status_cache = TTLCache(ttl=1.0)
+
+# Last (monotonic tick, utcnow) pair; timestamps within 10ms share one datetime
+_NOW_CACHE = (0.0, datetime.utcnow())
+
+def _now() -> datetime:
+    """Return the current UTC time, reusing the last value for up to 10ms"""
+    global _NOW_CACHE
+    tick = time.monotonic()
+    if tick - _NOW_CACHE[0] > 0.01:
+        _NOW_CACHE = (tick, datetime.utcnow())
+    return _NOW_CACHE[1]
+
+# Keys of a control result that are reported at the top level of the response
+_CONTROL_EXCLUDE = frozenset({"success", "message", "state", "error"})
+
+# Risk scores are deterministic in (device, vulnerabilities); the TTL keeps age factors fresh
+_risk_cache = TTLCache(ttl=60.0, maxsize=2048)
+
+def _scored_risk(device: Device, vulnerabilities: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Return risk scoring for a device, reusing a cached result while its inputs are unchanged"""
+    from app.utils.risk_scoring import risk_scorer
+    
+    # Remediation can change severity/CVSS in place, so those are part of the key
+    vuln_hash = hash(tuple(sorted(
+        (str(v.get("id")), str(v.get("severity")), str(v.get("cvss_score"))) for v in vulnerabilities
+    )))
+    key = (device.hash_id, device.updated_at, vuln_hash)
+    risk_data = _risk_cache.get(key)
+    if risk_data is None:
+        risk_data = risk_scorer.calculate_device_risk_score(device, vulnerabilities)
+        _risk_cache.set(key, risk_data)
+    return risk_data
+
 # Device Management Endpoints
 @router.get("/", response_model=List[DeviceInDB])
 async def list_devices(
@@ -82,6 +124,7 @@ async def update_device(device_id: str, device: DeviceUpdate, db: AsyncSession =
         device_service = DeviceService(db)
         update_data = device.dict(exclude_unset=True)
         updated_device = await device_service.update_device(device_id, update_data)
+        _status_cache.pop(device_id)
         
         if not updated_device:
             raise HTTPException(status_code=404, detail="Device not found")
@@ -100,6 +143,7 @@ async def update_device(device_id: str, device: DeviceUpdate, db: AsyncSession =
 @router.delete("/{device_id}")
 async def delete_device(
     device_id: str,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     current_user: Client = Depends(get_current_client)
 ):
@@ -108,18 +152,19 @@ async def delete_device(
         # Use raw SQL to delete the device directly without loading relationships
         from sqlalchemy import text
         
-        # First verify the device exists
-        query = select(Device.hash_id).where(Device.hash_id == device_id)
-        result = await db.execute(query)
-        found_id = result.scalar_one_or_none()
+        # Delete and verify existence in one round trip
+        sql = text("DELETE FROM devices WHERE hash_id = :hash_id RETURNING hash_id")
+        result = await db.execute(sql, {"hash_id": device_id})
         
-        if not found_id:
+        if result.scalar() is None:
+            await db.rollback()
             raise HTTPException(status_code=404, detail="Device not found")
-            
-        # Execute a raw SQL DELETE to bypass relationship loading
-        sql = text("DELETE FROM devices WHERE hash_id = :hash_id")
-        await db.execute(sql, {"hash_id": device_id})
+        
         await db.commit()
+        _status_cache.pop(device_id)
+        # The device_groups cascade changed the membership (and counts) of its groups
+        await invalidate_cached_groups()
+        background_tasks.add_task(refresh_vulnerability_dashboard)
         
         # Skip activity logging for now
         
@@ -146,6 +191,7 @@ async def control_device(device_id: str, action: str, parameters: Optional[Dict[
             user_id=current_user.id,
             user_ip=current_user.email  # Use email instead of non-existent last_ip
         )
+        _status_cache.pop(device_id)
         if not result.get("success", False):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -158,10 +204,10 @@ async def control_device(device_id: str, action: str, parameters: Optional[Dict[
             "action": action,
             "success": result.get("success", False),
             "message": result.get("message", f"Successfully executed {action} on device"),
-            "timestamp": datetime.utcnow(),
+            "timestamp": _now(),
             "result": {
                 "state": result.get("state", {}),
-                **{k: v for k, v in result.items() if k not in ["success", "message", "state", "error"]}
+                **{k: result[k] for k in result.keys() - _CONTROL_EXCLUDE}
             }
         }
         
@@ -172,25 +218,39 @@ async def control_device(device_id: str, action: str, parameters: Optional[Dict[
         logger.error(f"Error controlling device: {str(e)}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
-@router.get("/{device_id}/status", response_model=DeviceStatusResponse)
-async def get_device_status(device_id: str, db: AsyncSession = Depends(get_db), current_user: Client = Depends(get_current_client)):
+@router.api_route("/{device_id}/status", methods=["GET", "HEAD"], response_model=DeviceStatusResponse)
+async def get_device_status(
+    device_id: str,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    current_user: Client = Depends(get_current_client)
+):
     """Get device status (virtual simulation)"""
     try:
-        # First, explicitly verify device exists to avoid confusing errors
-        query = select(Device).where(Device.hash_id == device_id)
-        result = await db.execute(query)
-        device = result.scalars().first()
-        
-        if not device:
-            logger.warning(f"Device with ID {device_id} not found")
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail={"detail": "Device not found"}
-            )
+        cached = _status_cache.get(device_id)
+        if cached is None:
+            device_service = DeviceService(db)
+            device_status = await device_service.get_device_status(device_id)
             
-        # Now get the status
-        device_service = DeviceService(db)
-        device_status = await device_service.get_device_status(device_id)
+            if device_status is None:
+                logger.warning(f"Device with ID {device_id} not found")
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail={"detail": "Device not found"}
+                )
+            
+            last_updated = device_status.get("last_updated")
+            etag = f'W/"{device_id}-{last_updated.timestamp() if last_updated else 0}"'
+            cached = (device_status, etag)
+            _status_cache.set(device_id, cached)
+        
+        device_status, etag = cached
+        headers = {"ETag": etag, "Cache-Control": "max-age=2"}
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        
+        response.headers.update(headers)
         return device_status
     except HTTPException:
         raise
@@ -214,6 +274,7 @@ async def set_device_status(
             user_id=current_user.id,
             user_ip=current_user.email  # Use email instead of non-existent last_ip
         )
+        _status_cache.pop(device_id)
         if not device:
             raise HTTPException(status_code=404, detail="Device not found")
         return {"status": "success", "is_online": is_online}
@@ -241,6 +302,7 @@ async def simulate_device_action(
             user_id=current_user.id,
             user_ip=current_user.email  # Use email instead of non-existent last_ip
         )
+        _status_cache.pop(device_id)
         if not result.get("success", False):
             raise HTTPException(status_code=400, detail=result.get("error", "Simulation failed"))
         return result
@@ -251,6 +313,19 @@ async def simulate_device_action(
         raise HTTPException(status_code=500, detail=str(e))
 
 # Sensor Readings Endpoints
+async def _stream_readings(query):
+    """Stream readings matching query as a JSON array, one DB batch at a time"""
+    # The request-scoped session is closed before a streamed body is sent,
+    # so the generator owns its session for the lifetime of the stream
+    async with AsyncSessionLocal() as session:
+        readings = await session.stream_scalars(query.execution_options(yield_per=200))
+        try:
+            async for chunk in iter_json_array(readings, SensorReading.to_dict):
+                yield chunk
+        except Exception as e:
+            logger.error("Error streaming sensor readings: %s", e)
+            raise
+
 @router.get("/{device_id}/readings", response_model=List[SensorReadingResponse])
 async def get_device_readings(
     device_id: str,
@@ -259,13 +334,12 @@ async def get_device_readings(
     offset: int = 0,
     start_time: Optional[datetime] = None,
     end_time: Optional[datetime] = None,
-    db: AsyncSession = Depends(get_db),
     current_user: Client = Depends(get_current_client)
 ):
     """Get sensor readings for a device"""
     try:
-        # Build query
-        query = select(SensorReading).where(SensorReading.device_id == device_id)
+        # Build query; readings are serialized without touching relationships
+        query = select(SensorReading).where(SensorReading.device_id == device_id).options(raiseload("*"))
         
         if sensor_type:
             query = query.where(SensorReading.sensor_type == sensor_type)
@@ -277,11 +351,9 @@ async def get_device_readings(
         # Order and paginate
         query = query.order_by(desc(SensorReading.timestamp)).limit(limit).offset(offset)
         
-        # Execute query
-        result = await db.execute(query)
-        readings = result.scalars().all()
-        
-        return [reading.to_dict() for reading in readings]
+        # Rows are encoded as they arrive instead of materializing the whole page;
+        # the query is opened first so its errors still become a 500
+        return await start_json_stream(_stream_readings(query))
     except Exception as e:
         logger.error(f"Error getting sensor readings: {str(e)}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -348,16 +420,32 @@ async def get_device_history(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _activity_cursor(activity) -> str:
+    """Encode an activity's (timestamp, id) sort key as an opaque page cursor"""
+    return f"{activity.timestamp.isoformat()}_{activity.id}"
+
 @router.get("/{device_id}/activities", response_model=None)
 async def get_device_activities(
     device_id: str,
-    limit: int = Query(50, ge=1, le=500),
+    limit: int = Query(50, ge=0, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Get activity history for a device
+    
+    Pages are keyset-paginated: pass the returned next_cursor to fetch older
+    activities. Use limit=0 to only get the total count.
     """
     try:
+        before = None
+        if cursor is not None:
+            try:
+                before_timestamp, before_id = cursor.rsplit("_", 1)
+                before = (datetime.fromisoformat(before_timestamp), int(before_id))
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+        
         # Check if device exists
         device_service = DeviceService(db)
         device = await device_service.get_device_by_id(device_id)
@@ -368,12 +456,20 @@ async def get_device_activities(
         from app.services.activity_service import ActivityService
         activity_service = ActivityService(db)
         
-        activities = await activity_service.get_activities_by_target(
+        total = await activity_service.count_activities_by_target(
             target_type="device",
-            target_id=device_id,
-            limit=limit
+            target_id=device_id
         )
         
+        activities = []
+        if limit:
+            activities = await activity_service.get_activities_by_target(
+                target_type="device",
+                target_id=device_id,
+                limit=limit,
+                before=before
+            )
+        
         # Convert to API response
         activity_list = [activity.to_dict() for activity in activities]
         
@@ -381,9 +477,12 @@ async def get_device_activities(
             "device_id": device_id,
             "device_name": device.name,
             "activities": activity_list,
-            "total": len(activity_list)
+            "total": total,
+            "next_cursor": _activity_cursor(activities[-1]) if limit and len(activities) == limit else None
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting activities for device {device_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -405,19 +504,26 @@ async def simulate_device_snapshot(
         
         device_service = DeviceService(db)
         
-        # Check if device exists and is a camera
-        device = await device_service.get_device_by_id(device_id)
+        # Check if device exists and is a camera, fetching only the columns used here
+        query = select(
+            Device.device_type,
+            Device.is_online,
+            func.coalesce(Device.device_metadata["resolution"].as_string(), "1080p").label("resolution")
+        ).where(Device.hash_id == device_id)
+        result = await db.execute(query)
+        device = result.mappings().first()
         if not device:
             raise HTTPException(status_code=404, detail=f"Device with ID {device_id} not found")
             
-        if device.device_type != "CAMERA":
+        if device["device_type"] != "CAMERA":
             raise HTTPException(status_code=400, detail=f"Device with ID {device_id} is not a camera")
             
-        if not device.is_online:
+        if not device["is_online"]:
             raise HTTPException(status_code=400, detail=f"Camera is offline")
         
         # Generate timestamp
-        timestamp = datetime.utcnow()
+        timestamp = _now()
+        snapshot_id = f"{int(timestamp.timestamp())}"
         
         # Log activity
         await device_service.control_device(
@@ -426,15 +532,16 @@ async def simulate_device_snapshot(
             user_id=user_id,
             user_ip=user_ip
         )
+        _status_cache.pop(device_id)
         
         # Return mock snapshot data
         return {
             "success": True,
             "device_id": device_id,
             "timestamp": timestamp.isoformat(),
-            "snapshot_id": f"{int(timestamp.timestamp())}",
-            "image_url": f"/api/devices/{device_id}/snapshots/{int(timestamp.timestamp())}",
-            "resolution": device.device_metadata.get("resolution", "1080p"),
+            "snapshot_id": snapshot_id,
+            "image_url": f"/api/devices/{device_id}/snapshots/{snapshot_id}",
+            "resolution": device["resolution"],
             "format": "jpeg"
         }
         
@@ -461,16 +568,18 @@ async def simulate_device_status_update(
             raise HTTPException(status_code=404, detail=f"Device with ID {device_id} not found")
             
         # Update device status
+        timestamp = _now()
         await device_service.update_device(
             device_id=device_id,
-            device_data={"is_online": status == "online", "last_seen": datetime.utcnow()}
+            device_data={"is_online": status == "online", "last_seen": timestamp}
         )
+        _status_cache.pop(device_id)
         
         return {
             "success": True,
             "device_id": device_id,
             "status": status,
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": timestamp.isoformat()
         }
         
     except Exception as e:
@@ -642,7 +751,7 @@ async def get_device_vulnerabilities(
     
     # Add risk scoring if requested
     if include_risk_score:
-        risk_data = risk_scorer.calculate_device_risk_score(device, vulnerabilities)
+        risk_data = _scored_risk(device, vulnerabilities)
         result["risk_score"] = risk_data["total_score"]
         result["risk_level"] = risk_data["risk_level"]
         
@@ -0,0 +1,391 @@
+"""
+Firmware Status API for IoT Platform
+------------------------------------
+Firmware status checking, fleet summaries and vulnerability remediation
+through firmware updates. Mounted under the same /firmware prefix as the
+firmware management endpoints, ahead of them so these fixed paths are not
+captured by the /{firmware_id} route.
+"""
+from datetime import datetime
+from typing import List, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select, func, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+
+from app.models.database import AsyncSessionLocal, get_db
+from app.models.device import Device
+from app.services.device_management_service import DeviceService
+from app.services.firmware_service import FirmwareService, LatestFirmware, latest_firmware_batcher, latest_firmware_query
+from app.utils.vulnerability_utils import vulnerability_manager
+from app.api.deps import get_current_client, get_device_service, get_firmware_service
+from app.api.utils import iter_json_array, json_dumps, start_json_stream
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+@router.get("/status/device/{device_id}")
+async def check_device_firmware_status(
+    device_id: str,
+    include_vulnerabilities: bool = Query(True, description="Include vulnerability information"),
+    device_service: DeviceService = Depends(get_device_service)
+):
+    """
+    Check if a specific device's firmware is up to date
+    
+    Returns firmware status information and update recommendations
+    Also checks for vulnerabilities that could be fixed by firmware update
+    """
+    # Get device info
+    device = await device_service.get_device_by_id(device_id)
+    
+    if not device:
+        raise HTTPException(status_code=404, detail="Device not found")
+    
+    # Get latest firmware for device type
+    latest_firmware = await latest_firmware_batcher.get(device.device_type)
+    
+    if not latest_firmware:
+        return {
+            "status": "no_firmware",
+            "message": f"No firmware found for device type {device.device_type}",
+            "device": device.to_dict()
+        }
+    
+    # Compare versions - simplified for demo
+    current_version = device.firmware_version or "0.0.0"
+    latest_version = latest_firmware.version
+    
+    # Basic version comparison (in production, would use proper semver)
+    needs_update = current_version != latest_version
+    
+    result = {
+        "device": device.to_dict(),
+        "current_firmware": {
+            "version": current_version,
+            "last_updated": device.last_firmware_check
+        },
+        "latest_firmware": {
+            "version": latest_version,
+            "release_date": latest_firmware.release_date,
+            "is_critical": latest_firmware.is_critical
+        },
+        "status": "needs_update" if needs_update else "up_to_date",
+        "update_recommended": needs_update
+    }
+    
+    # Include vulnerability information if requested
+    if include_vulnerabilities:
+        # Get device vulnerabilities
+        vulnerabilities = vulnerability_manager.get_device_vulnerabilities(device_id)
+        
+        # Get vulnerabilities that would be fixed by a firmware update
+        # (simplified - a real system would check what this firmware version addresses)
+        fixable_vulnerabilities = (
+            vulnerability_manager.get_firmware_fixable_vulnerabilities(device_id) if needs_update else []
+        )
+        
+        result["vulnerabilities"] = {
+            "total_count": len(vulnerabilities) if vulnerabilities else 0,
+            "fixable_by_update": len(fixable_vulnerabilities),
+            "fixable_vulnerabilities": fixable_vulnerabilities
+        }
+    
+    return result
+
+def _device_status_entry(
+    row,
+    vuln_map: Dict[str, List[Dict[str, Any]]],
+    fixable_map: Dict[str, List[Dict[str, Any]]],
+    include_vulnerabilities: bool
+) -> Dict[str, Any]:
+    """Build the firmware status entry for one row of the fleet status query"""
+    needs_update = row.needs_update
+    
+    device_data = {
+        "device": {
+            "id": row.hash_id,
+            "name": row.name,
+            "device_type": row.device_type
+        },
+        "current_firmware": {
+            "version": row.current_version,
+            "last_updated": row.last_firmware_check
+        },
+        "latest_firmware": {
+            "version": row.latest_version,
+            "release_date": row.latest_release_date,
+            "is_critical": row.latest_is_critical
+        },
+        "status": "needs_update" if needs_update else "up_to_date",
+        "update_recommended": needs_update
+    }
+    
+    # Include vulnerability information if requested
+    if include_vulnerabilities:
+        device_data["vulnerabilities"] = {
+            "total_count": len(vuln_map.get(row.hash_id, ())),
+            "fixable_by_update": len(fixable_map.get(row.hash_id, ())) if needs_update else 0
+        }
+    
+    return device_data
+
+def _device_status_batch(partition, include_vulnerabilities: bool) -> List[Dict[str, Any]]:
+    """Build the status entries for one batch of rows, looking up vulnerabilities once"""
+    vuln_map, fixable_map = {}, {}
+    if include_vulnerabilities:
+        device_ids = [row.hash_id for row in partition]
+        vuln_map = vulnerability_manager.get_vulnerabilities_for_devices(device_ids)
+        fixable_map = vulnerability_manager.get_firmware_fixable_for_devices(device_ids)
+    return [_device_status_entry(row, vuln_map, fixable_map, include_vulnerabilities) for row in partition]
+
+async def _iter_device_statuses(first_partition, partitions, include_vulnerabilities: bool):
+    """Yield status entries batch by batch, starting with an already fetched batch"""
+    for entry in _device_status_batch(first_partition, include_vulnerabilities):
+        yield entry
+    async for partition in partitions:
+        for entry in _device_status_batch(partition, include_vulnerabilities):
+            yield entry
+
+async def _stream_device_statuses(query, summary: Dict[str, Any], include_vulnerabilities: bool):
+    """Stream the fleet firmware status as {"summary": ..., "devices": [...]}"""
+    # The request-scoped session is closed before a streamed body is sent,
+    # so the generator owns its session for the lifetime of the stream
+    async with AsyncSessionLocal() as session:
+        # The first batch is fetched before anything is sent, so query errors still become a 500
+        result = await session.stream(query.execution_options(yield_per=200))
+        partitions = result.partitions()
+        first_partition = await anext(partitions, [])
+        yield b'{"summary":' + json_dumps(summary) + b',"devices":'
+        try:
+            devices = _iter_device_statuses(first_partition, partitions, include_vulnerabilities)
+            async for chunk in iter_json_array(devices):
+                yield chunk
+            yield b"}"
+        except Exception as e:
+            logger.error("Error streaming firmware status: %s", e)
+            raise
+
+@router.get("/status/all")
+async def check_all_devices_firmware_status(
+    device_type: str = Query(None, description="Filter by device type"),
+    status: str = Query(None, description="Filter by status (needs_update, up_to_date, all)"),
+    include_vulnerabilities: bool = Query(True, description="Include vulnerability information"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Check firmware status for all devices
+    
+    Returns a summary of devices that need updates and those that are up to date
+    """
+    # Latest firmware per device type, joined to devices so filtering happens in SQL
+    latest = latest_firmware_query().subquery("latest")
+    current_version_expr = func.coalesce(Device.firmware_version, "0.0.0")
+    needs_update_expr = current_version_expr.is_distinct_from(latest.c.version)
+    has_latest = latest.c.version.is_not(None)
+    
+    # Summary counts over every matching device, computed in a single aggregate
+    summary_query = (
+        select(
+            func.count().label("total"),
+            func.count().filter(has_latest, needs_update_expr).label("needs_update"),
+            func.count().filter(has_latest, ~needs_update_expr).label("up_to_date")
+        )
+        .select_from(Device)
+        .outerjoin(latest, latest.c.device_type == Device.device_type)
+    )
+    if device_type:
+        summary_query = summary_query.where(Device.device_type == device_type)
+    
+    counts = (await db.execute(summary_query)).one()
+    
+    if not counts.total:
+        return {
+            "status": "no_devices",
+            "message": "No devices found with the specified criteria",
+            "devices": []
+        }
+    
+    # Devices with known latest firmware, filtered by type/status and limited in SQL
+    query = (
+        select(
+            Device.hash_id,
+            Device.name,
+            Device.device_type,
+            Device.last_firmware_check,
+            current_version_expr.label("current_version"),
+            latest.c.version.label("latest_version"),
+            latest.c.release_date.label("latest_release_date"),
+            latest.c.is_critical.label("latest_is_critical"),
+            needs_update_expr.label("needs_update")
+        )
+        .join(latest, latest.c.device_type == Device.device_type)
+    )
+    if device_type:
+        query = query.where(Device.device_type == device_type)
+    if status == "needs_update":
+        query = query.where(needs_update_expr)
+    elif status == "up_to_date":
+        query = query.where(~needs_update_expr)
+    query = query.limit(limit)
+    
+    summary = {
+        "total_devices": counts.total,
+        "needs_update": counts.needs_update,
+        "up_to_date": counts.up_to_date,
+        "update_percentage": round(counts.needs_update / counts.total * 100, 1)
+    }
+    
+    # Device rows are encoded as they arrive instead of building the whole list
+    return await start_json_stream(_stream_device_statuses(query, summary, include_vulnerabilities))
+
+@router.get("/status/summary")
+async def get_firmware_status_summary(
+    include_vulnerabilities: bool = Query(True, description="Include vulnerability metrics"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get a summary of firmware status across all devices
+    
+    Returns counts and percentages of devices needing updates
+    """
+    # Per-type totals, update counts and latest version in one grouped query
+    latest = latest_firmware_query().subquery("latest")
+    needs_update_expr = and_(
+        latest.c.version.is_not(None),
+        func.coalesce(Device.firmware_version, "0.0.0").is_distinct_from(latest.c.version)
+    )
+    query = (
+        select(
+            Device.device_type,
+            func.count().label("total"),
+            func.count().filter(needs_update_expr).label("needs_update"),
+            func.count().filter(needs_update_expr, latest.c.is_critical).label("critical"),
+            func.max(latest.c.version).label("latest_version")
+        )
+        .select_from(Device)
+        .outerjoin(latest, latest.c.device_type == Device.device_type)
+        .group_by(Device.device_type)
+    )
+    rows = (await db.execute(query)).all()
+    
+    # If no devices, return empty summary
+    if not rows:
+        return {
+            "status": "no_devices",
+            "message": "No devices found in system",
+            "summary": {
+                "total_devices": 0,
+                "needs_update": 0,
+                "up_to_date": 0,
+                "update_percentage": 0
+            }
+        }
+    
+    total_devices = sum(row.total for row in rows)
+    needs_update_count = sum(row.needs_update for row in rows)
+    
+    # Prepare summary
+    summary = {
+        "total_devices": total_devices,
+        "needs_update": needs_update_count,
+        "up_to_date": total_devices - needs_update_count,
+        "critical_updates": sum(row.critical for row in rows),
+        "update_percentage": round(needs_update_count / total_devices * 100, 1),
+        "by_device_type": {
+            row.device_type: {
+                "total": row.total,
+                "latest_firmware": row.latest_version or "unknown"
+            } for row in rows
+        }
+    }
+    
+    # Include vulnerability information if requested
+    if include_vulnerabilities:
+        # Count vulnerabilities fixable by firmware update across current devices
+        device_ids = (await db.execute(select(Device.hash_id))).scalars()
+        summary["vulnerability_metrics"] = {
+            "fixable_by_firmware": vulnerability_manager.count_firmware_fixable(device_ids)
+        }
+    
+    return {
+        "status": "success",
+        "summary": summary,
+        "timestamp": datetime.utcnow()
+    }
+
+def _remediation_entry(device: Device, latest_firmware: LatestFirmware, firmware_fixable: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Build the remediation plan entry for a device that needs a firmware update"""
+    return {
+        "device": {
+            "id": device.hash_id,
+            "name": device.name,
+            "device_type": device.device_type,
+            "current_firmware": device.firmware_version or "0.0.0"
+        },
+        "firmware_update": {
+            "version": latest_firmware.version,
+            "is_critical": latest_firmware.is_critical
+        },
+        "fixable_vulnerabilities": [
+            {
+                "id": v.get("id"),
+                "title": v.get("title"),
+                "severity": v.get("severity")
+            } for v in firmware_fixable
+        ],
+        "recommendation": "Update firmware to fix vulnerabilities"
+    }
+
+@router.get("/vulnerability-remediation")
+async def get_firmware_vulnerability_remediation(
+    db: AsyncSession = Depends(get_db),
+    firmware_service: FirmwareService = Depends(get_firmware_service),
+    current_client = Depends(get_current_client)
+):
+    """
+    Get mapping between firmware updates and vulnerability remediation
+    
+    Shows which vulnerabilities can be fixed by firmware updates and provides
+    remediation recommendations for device fleet
+    """
+    # Get all devices
+    query = select(Device).options(
+        load_only(Device.hash_id, Device.name, Device.device_type, Device.firmware_version)
+    )
+    result = await db.execute(query)
+    devices = result.scalars().all()
+    
+    if not devices:
+        return {
+            "status": "no_devices",
+            "message": "No devices found in system",
+            "remediation_plan": []
+        }
+    
+    # Preload firmware-fixable vulnerabilities and latest firmware for the whole fleet
+    firmware_fixable = vulnerability_manager.get_firmware_fixable_for_devices(d.hash_id for d in devices)
+    latest_by_type = await firmware_service.get_latest_firmware_for_device_types(
+        list({d.device_type for d in devices if d.hash_id in firmware_fixable})
+    )
+    
+    # Devices with firmware-fixable vulnerabilities that are behind the latest firmware
+    remediation_plan = [
+        _remediation_entry(device, latest_by_type[device.device_type], firmware_fixable[device.hash_id])
+        for device in devices
+        if device.hash_id in firmware_fixable
+        and device.device_type in latest_by_type
+        and (device.firmware_version or "0.0.0") != latest_by_type[device.device_type].version
+    ]
+    
+    # Sort by number of vulnerabilities (descending)
+    remediation_plan.sort(key=lambda x: len(x["fixable_vulnerabilities"]), reverse=True)
+    
+    return {
+        "status": "success",
+        "total_devices_with_fixable_vulnerabilities": len(remediation_plan),
+        "remediation_plan": remediation_plan
+    }
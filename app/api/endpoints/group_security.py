@@ -1,18 +1,19 @@
 """Group Security API endpoints for IoT platform"""
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Path, Query
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Path, Query, Response
 from typing import Dict, List, Any, Optional
 
 from app.api.schemas import ResponseModel
-from app.models.database import get_db
-from app.services.group_management_service import create_group_vulnerability_service, GroupVulnerabilityService
-from app.api.deps import get_current_client
+from app.services.group_management_service import GroupVulnerabilityService, DASHBOARD_CACHE_PREFIX
+from app.api.deps import get_current_client, get_group_vulnerability_service
+from app.api.utils import json_dumps
+from app.utils.shared_cache import shared_cache
 
 router = APIRouter()
 
-async def get_group_vulnerability_service(db_session: AsyncSession = Depends(get_db)):
-    """Get a group vulnerability service instance with DB session"""
-    return create_group_vulnerability_service(db_session)
+# Dashboard responses are cached per limit and dropped whenever group membership changes
+DASHBOARD_CACHE_TTL = 45
+# Polling clients may reuse a response briefly; private because the dashboard requires auth
+DASHBOARD_CACHE_HEADERS = {"Cache-Control": "private, max-age=30"}
 
 @router.post("/groups/{group_id}/scan", response_model=ResponseModel)
 async def start_group_vulnerability_scan(
@@ -27,12 +28,15 @@ async def start_group_vulnerability_scan(
     This is an asynchronous operation. The response includes a scan_id
     that can be used to check scan status and retrieve results.
     """
-    # Start the group scan
-    result = await service.scan_group(group_id)
+    # Only the scan record is created here; the scan runs after the response is sent
+    result = await service.reserve_scan_id(group_id)
     
     if result.get("status") == "failed":
         raise HTTPException(status_code=404, detail=result.get("message"))
     
+    if result.get("status") == "started":
+        background_tasks.add_task(GroupVulnerabilityService.run_scan, result["scan_id"])
+    
     return {
         "status": "success",
         "data": result,
@@ -73,11 +77,19 @@ async def get_group_vulnerability_dashboard(
     Returns an overview of vulnerability statistics for all groups,
     sorted by risk score (highest risk first).
     """
+    cache_key = f"{DASHBOARD_CACHE_PREFIX}{limit}"
+    cached = await shared_cache.get(cache_key)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json", headers=DASHBOARD_CACHE_HEADERS)
+    
     # Get dashboard data from the service
     dashboard_data = await service.get_vulnerability_dashboard(limit=limit)
     
-    return {
+    body = json_dumps({
         "status": "success",
         "data": dashboard_data,
         "message": "Group vulnerability dashboard data"
-    }
+    })
+    await shared_cache.set(cache_key, body, ttl=DASHBOARD_CACHE_TTL)
+    
+    return Response(content=body, media_type="application/json", headers=DASHBOARD_CACHE_HEADERS)
@@ -1,69 +1,88 @@
 """Group API endpoints for IoT platform"""
-import traceback
 import logging
 from typing import List, Optional, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, Query, Path, Body, status
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Path, Body, Response, status
 from sqlalchemy.exc import SQLAlchemyError
 
 logger = logging.getLogger(__name__)
 
-from app.models.database import get_db
-from app.services.group_management_service import GroupService
-from app.api.deps import get_current_client
+from app.services.group_management_service import GroupService, GROUPS_CACHE_PREFIX, refresh_vulnerability_dashboard
+from app.api.deps import get_current_client, get_group_service
+from app.api.utils import iter_json_array, json_dumps, start_json_stream
+from app.models.database import AsyncSessionLocal
+from app.utils.shared_cache import shared_cache
 from app.api.schemas import (
     GroupCreate, GroupUpdate, GroupResponse, GroupWithDevices
 )
 
 router = APIRouter()
 
-@router.get("/", response_model=List[GroupResponse])
+# Lookups by device and by group type are cached briefly; GroupService drops them on every change
+GROUPS_CACHE_TTL = 30
+# Untyped listings larger than this are streamed row by row instead of built in memory
+GROUPS_STREAM_THRESHOLD = 100
+
+async def _stream_groups(query):
+    """Stream a group listing as a JSON array"""
+    # The request-scoped session is closed before a streamed body is sent,
+    # so the generator owns its session for the lifetime of the stream
+    async with AsyncSessionLocal() as session:
+        result = await session.stream(query.execution_options(yield_per=200))
+        try:
+            async for chunk in iter_json_array(result, GroupService.lite_group_dict):
+                yield chunk
+        except Exception as e:
+            logger.error("Error streaming groups: %s", e)
+            raise
+
+# Hot read endpoints return the already-shaped dicts from GroupService directly;
+# the schema is kept in `responses` for the OpenAPI docs only
+
+@router.get(
+    "/",
+    response_model=None,
+    responses={200: {"model": List[GroupResponse]}}
+)
 async def list_groups(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     group_type: Optional[str] = Query(None, description="Filter by group type"),
-    db: AsyncSession = Depends(get_db),
+    group_service: GroupService = Depends(get_group_service),
     current_user = Depends(get_current_client)
 ):
     """List all groups with optional filtering by type"""
+    logger.info("Listing groups with skip=%s, limit=%s, type=%s", skip, limit, group_type)
     try:
-        logger.info(f"Listing groups with skip={skip}, limit={limit}, type={group_type}")
-        group_service = GroupService(db)
+        if group_type:
+            cache_key = f"{GROUPS_CACHE_PREFIX}type:{group_type}:{skip}:{limit}"
+            cached = await shared_cache.get(cache_key)
+            if cached is not None:
+                return Response(content=cached, media_type="application/json")
+        elif limit > GROUPS_STREAM_THRESHOLD:
+            # The query is opened before responding, so database errors are handled below
+            return await start_json_stream(_stream_groups(GroupService.lite_groups_query(skip, limit)))
         
-        try:
-            if group_type:
-                groups = await group_service.get_groups_by_type(group_type)
-            else:
-                groups = await group_service.get_all_groups(skip=skip, limit=limit)
-        except SQLAlchemyError as db_error:
-            logger.error(f"Database error: {str(db_error)}")
-            logger.error(traceback.format_exc())
-            raise HTTPException(
-                status_code=500,
-                detail={
-                    "error": "Database error",
-                    "message": str(db_error)
-                }
-            )
-        
-        # Use service method to format response with device counts
-        try:
-            result = group_service.format_groups_response(groups)
-        except Exception as e:
-            logger.error(f"Error processing group data: {str(e)}")
-            logger.error(traceback.format_exc())
-            raise HTTPException(
-                status_code=500,
-                detail={
-                    "error": "Data processing error",
-                    "message": str(e)
-                }
-            )
+        # Columns and device counts come back in one query, already shaped for the response
+        result = await group_service.get_all_groups_lite(skip=skip, limit=limit, group_type=group_type)
         
+        if group_type:
+            body = json_dumps(result)
+            await shared_cache.set(cache_key, body, ttl=GROUPS_CACHE_TTL)
+            return Response(content=body, media_type="application/json")
         return result
+    except SQLAlchemyError as db_error:
+        logger.exception("Database error in list_groups: %s", db_error)
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "error": "Database error",
+                "message": str(db_error)
+            }
+        )
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Unexpected error in list_groups: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception("Unexpected error in list_groups: %s", e)
         raise HTTPException(
             status_code=500,
             detail={
@@ -75,12 +94,11 @@ async def list_groups(
 @router.post("/", response_model=GroupResponse, status_code=status.HTTP_201_CREATED)
 async def create_group(
     group_data: GroupCreate,
-    db: AsyncSession = Depends(get_db),
+    background_tasks: BackgroundTasks,
+    group_service: GroupService = Depends(get_group_service),
     current_user = Depends(get_current_client)
 ):
     """Create a new group"""
-    group_service = GroupService(db)
-    
     group = await group_service.create_group(
         name=group_data.name,
         description=group_data.description,
@@ -89,19 +107,23 @@ async def create_group(
         attributes=group_data.attributes,
         device_ids=group_data.device_ids
     )
+    background_tasks.add_task(refresh_vulnerability_dashboard)
     
     return group_service.format_group_response(group)
 
-@router.get("/{group_id}", response_model=GroupResponse)
+@router.get(
+    "/{group_id}",
+    response_model=None,
+    responses={200: {"model": GroupResponse}}
+)
 async def get_group(
     group_id: int = Path(..., gt=0),
-    db: AsyncSession = Depends(get_db),
+    group_service: GroupService = Depends(get_group_service),
     current_user = Depends(get_current_client)
 ):
     """Get a specific group by ID"""
-    group_service = GroupService(db)
-    
-    group = await group_service.get_group_by_id(group_id)
+    # device_count is a column, so the devices don't need to be loaded
+    group = await group_service.get_group_by_id(group_id, with_devices=False)
     if not group:
         raise HTTPException(status_code=404, detail=f"Group with ID {group_id} not found")
     
@@ -110,32 +132,26 @@ async def get_group(
 @router.get("/{group_id}/devices", response_model=GroupWithDevices)
 async def get_group_with_devices(
     group_id: int = Path(..., gt=0),
-    db: AsyncSession = Depends(get_db),
+    group_service: GroupService = Depends(get_group_service),
     current_user = Depends(get_current_client)
 ):
     """Get a specific group with its devices"""
-    group_service = GroupService(db)
-    
     group = await group_service.get_group_by_id(group_id)
     if not group:
         raise HTTPException(status_code=404, detail=f"Group with ID {group_id} not found")
     
-    # Return group with device information
-    result = group.to_dict_with_devices()
-    # Add device count using same logic as our service method
-    result["device_count"] = len(group.devices) if group.devices else 0
-    return result
+    # Devices were loaded with the group, so this needs no further queries
+    return group.to_dict_with_devices()
 
 @router.put("/{group_id}", response_model=GroupResponse)
 async def update_group(
+    background_tasks: BackgroundTasks,
     group_data: GroupUpdate,
     group_id: int = Path(..., gt=0),
-    db: AsyncSession = Depends(get_db),
+    group_service: GroupService = Depends(get_group_service),
     current_user = Depends(get_current_client)
 ):
     """Update a group"""
-    group_service = GroupService(db)
-    
     updated_group = await group_service.update_group(
         group_id=group_id,
         name=group_data.name,
@@ -148,71 +164,75 @@ async def update_group(
     
     if not updated_group:
         raise HTTPException(status_code=404, detail=f"Group with ID {group_id} not found")
+    background_tasks.add_task(refresh_vulnerability_dashboard)
     
     return group_service.format_group_response(updated_group)
 
 @router.delete("/{group_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_group(
+    background_tasks: BackgroundTasks,
     group_id: int = Path(..., gt=0),
-    db: AsyncSession = Depends(get_db),
+    group_service: GroupService = Depends(get_group_service),
     current_user = Depends(get_current_client)
 ):
     """Delete a group"""
-    group_service = GroupService(db)
-    
     success = await group_service.delete_group(group_id)
     if not success:
         raise HTTPException(status_code=404, detail=f"Group with ID {group_id} not found")
+    background_tasks.add_task(refresh_vulnerability_dashboard)
 
 @router.post("/{group_id}/devices", response_model=GroupResponse)
 async def add_devices_to_group(
+    background_tasks: BackgroundTasks,
     device_ids: List[str] = Body(..., description="List of device hash IDs to add to the group"),
     group_id: int = Path(..., gt=0),
-    db: AsyncSession = Depends(get_db),
+    group_service: GroupService = Depends(get_group_service),
     current_user = Depends(get_current_client)
 ):
     """Add devices to a group"""
-    group_service = GroupService(db)
-    
-    success = await group_service.add_devices_to_group(group_id, device_ids)
-    if not success:
+    result = await group_service.add_devices_to_group(group_id, device_ids)
+    if result is None:
         raise HTTPException(status_code=404, detail=f"Group with ID {group_id} not found")
+    background_tasks.add_task(refresh_vulnerability_dashboard)
     
-    # Return updated group
-    group = await group_service.get_group_by_id(group_id)
-    group_dict = group.to_dict()
-    group_dict["device_count"] = len(group.devices) if group.devices else 0
-    return group_dict
+    group, device_count = result
+    return group_service.format_group_response(group, device_count)
 
 @router.delete("/{group_id}/devices", response_model=GroupResponse)
 async def remove_devices_from_group(
+    background_tasks: BackgroundTasks,
     device_ids: List[str] = Body(..., description="List of device hash IDs to remove from the group"),
     group_id: int = Path(..., gt=0),
-    db: AsyncSession = Depends(get_db),
+    group_service: GroupService = Depends(get_group_service),
     current_user = Depends(get_current_client)
 ):
     """Remove devices from a group"""
-    group_service = GroupService(db)
-    
-    success = await group_service.remove_devices_from_group(group_id, device_ids)
-    if not success:
+    result = await group_service.remove_devices_from_group(group_id, device_ids)
+    if result is None:
         raise HTTPException(status_code=404, detail=f"Group with ID {group_id} not found")
+    background_tasks.add_task(refresh_vulnerability_dashboard)
     
-    # Return updated group
-    group = await group_service.get_group_by_id(group_id)
-    group_dict = group.to_dict()
-    group_dict["device_count"] = len(group.devices) if group.devices else 0
-    return group_dict
+    group, device_count = result
+    return group_service.format_group_response(group, device_count)
 
-@router.get("/device/{device_id}", response_model=List[GroupResponse])
+@router.get(
+    "/device/{device_id}",
+    response_model=None,
+    responses={200: {"model": List[GroupResponse]}}
+)
 async def get_device_groups(
     device_id: str = Path(..., description="Device hash ID"),
-    db: AsyncSession = Depends(get_db),
+    group_service: GroupService = Depends(get_group_service),
     current_user = Depends(get_current_client)
 ):
     """Get all groups for a specific device"""
-    group_service = GroupService(db)
+    cache_key = f"{GROUPS_CACHE_PREFIX}device:{device_id}"
+    cached = await shared_cache.get(cache_key)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
     
     groups = await group_service.get_groups_for_device(device_id)
     
-    return group_service.format_groups_response(groups)
+    body = json_dumps(group_service.format_groups_response(groups))
+    await shared_cache.set(cache_key, body, ttl=GROUPS_CACHE_TTL)
+    return Response(content=body, media_type="application/json")
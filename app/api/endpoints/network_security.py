@@ -1,16 +1,21 @@
 """Network Security Simulation API for IoT platform dashboard"""
+import asyncio
 import random
 import logging
-from typing import Dict, List, Any, Optional
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
 from datetime import datetime, timedelta
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import text
+from sqlalchemy import func, select, text, true
 from pydantic import BaseModel
 
-from app.models.database import get_db
+from app.models.database import AsyncSessionLocal, get_db
 from app.models.device import Device
+from app.models.network_security import network_security_summary
 from app.api.deps import get_current_client
+from app.api.utils import FastJSONResponse
+from app.utils.cache import TTLCache
 from app.utils.notification_helper import NotificationHelper
 
 router = APIRouter()
@@ -50,11 +55,155 @@ ATTACK_TYPES = {
     }
 }
 
+# Attack types flattened to (key, name, description, risk_level, remediation) rows,
+# built once so the event loop unpacks a tuple instead of doing dict lookups
+ATTACK_ROWS = tuple(
+    (key, attack["name"], attack["description"], attack["risk_level"], attack["remediation"])
+    for key, attack in ATTACK_TYPES.items()
+)
+ATTACK_ROWS_BY_SEVERITY = {
+    severity: tuple(row for row in ATTACK_ROWS if row[3] == severity)
+    for severity in ("low", "medium", "high")
+}
+
 # Simulated protocols
-PROTOCOLS = ["HTTP", "MQTT", "CoAP", "TCP", "UDP", "AMQP", "BLE"]
+PROTOCOLS = ("HTTP", "MQTT", "CoAP", "TCP", "UDP", "AMQP", "BLE")
+
+# Precomputed pools for simulated values, so events and nodes don't format strings per item:
+# every 192.168.0-5.x host, a fixed sample of external addresses, and 0.10-10.00 MB in 0.01 steps
+_INTERNAL_IPS = tuple(f"192.168.{subnet}.{host}" for subnet in range(6) for host in range(1, 255))
+_EXTERNAL_IPS = tuple(
+    f"{random.randint(1, 223)}.{random.randint(0, 255)}.{random.randint(0, 255)}.{random.randint(0, 255)}"
+    for _ in range(4096)
+)
+_TALKER_BANDWIDTHS = tuple(f"{hundredths / 100:.2f} MB" for hundredths in range(10, 1001))
+
+# Topology node types for devices: the id indexes NODE_TYPE_NAMES and the per-type buckets
+NT_DEVICE, NT_GATEWAY, NT_CONTROLLER, NT_SENSOR = range(4)
+NODE_TYPE_NAMES = ("device", "gateway", "controller", "sensor")
+# Device type substrings that map to a dedicated node type, checked in order
+NODE_TYPE_KEYWORDS = (("gateway", NT_GATEWAY), ("controller", NT_CONTROLLER), ("sensor", NT_SENSOR))
+
+# Topology edge bandwidth labels, formatted once: index n of _MBPS_LABELS is "n Mbps"
+_MBPS_LABELS = tuple(f"{mbps} Mbps" for mbps in range(101))
+_KBPS_LABELS = tuple(f"{kbps} Kbps" for kbps in range(100, 1001))
+# Sensor link protocols, by what the sensor connects to
+_CONTROLLER_LINK_PROTOCOLS = ("Zigbee", "Z-Wave", "BLE")
+_GATEWAY_LINK_PROTOCOLS = ("WiFi", "Zigbee", "Z-Wave")
+
+# Traffic series shape per period: (number of points, spacing between points)
+TRAFFIC_SERIES_STEPS = {
+    "1h": (12, timedelta(minutes=5)),
+    "24h": (24, timedelta(hours=1)),
+    "7d": (7, timedelta(days=1))
+}
+# Traffic multiplier by hour of day: busier during work hours (9-17), quieter at night (0-5)
+_HOURLY_TRAFFIC_FACTORS = tuple(
+    1.5 if 9 <= hour <= 17 else 0.3 if hour <= 5 else 1.0
+    for hour in range(24)
+)
+
+# The summary's device and vulnerability counts come from the network_security_summary
+# materialized view, rebuilt in the background once it is older than this
+SUMMARY_REFRESH_INTERVAL = timedelta(seconds=60)
+_summary_refresh_pending = False
+
+# Synthetic summary/traffic payloads are shared by every poller for a few seconds;
+# each entry is a (payload, etag) pair, and one lock per key coalesces regeneration
+SNAPSHOT_TTL = 5
+SNAPSHOT_CACHE_HEADERS = {"Cache-Control": f"private, max-age={SNAPSHOT_TTL}"}
+_snapshot_cache = TTLCache(ttl=float(SNAPSHOT_TTL), maxsize=32)
+_snapshot_locks: Dict[Hashable, asyncio.Lock] = {}
+
+# Statements are built once at import; SQLAlchemy's compiled cache and asyncpg's
+# prepared statement cache then reuse them across requests
+DEVICES_ALL_STMT = select(Device.hash_id, Device.name, Device.device_type)
+DEVICES_SAMPLE_STMT = DEVICES_ALL_STMT.limit(50)
+
+def _count_devices_where(flag) -> Any:
+    """Scalar COUNT(*) of devices with a protocol flag set (served by its partial index)"""
+    return select(func.count()).select_from(Device).where(flag).scalar_subquery()
+
+# Device protocol support counts plus up to 50 sample devices, fetched together.
+# Each count is its own subquery so it can use the matching partial index
+_protocol_counts = select(
+    _count_devices_where(Device.supports_http).label("http_count"),
+    _count_devices_where(Device.supports_mqtt).label("mqtt_count"),
+    _count_devices_where(Device.supports_coap).label("coap_count"),
+    _count_devices_where(Device.supports_websocket).label("ws_count")
+).cte("counts")
+_device_sample = DEVICES_SAMPLE_STMT.lateral("sample")
+TRAFFIC_STATS_STMT = select(_protocol_counts, _device_sample).select_from(
+    _protocol_counts.outerjoin(_device_sample, true())
+)
+
+async def _notify_security_event(event: Dict[str, Any]) -> None:
+    """Send the notification for a high severity event on a dedicated session"""
+    async with AsyncSessionLocal() as session:
+        try:
+            await NotificationHelper.notify_security_event(
+                db=session,
+                event_type=event['name'],
+                source_ip=event['source']['ip'],
+                target_ip=event['target']['ip'],
+                severity='high'
+            )
+            logger.info("Triggered notification for security event: %s", event['id'])
+        except Exception as e:
+            logger.error("Error sending security event notification: %s", e)
+
+async def _cached_snapshot(
+    key: Hashable, build: Callable[[], Awaitable[Dict[str, Any]]]
+) -> Tuple[Dict[str, Any], str]:
+    """Return the cached (payload, etag) for key, building it once per snapshot window"""
+    cached = _snapshot_cache.get(key)
+    if cached is None:
+        async with _snapshot_locks.setdefault(key, asyncio.Lock()):
+            cached = _snapshot_cache.get(key)
+            if cached is None:
+                payload = await build()
+                cached = (payload, f'W/"{random.getrandbits(64):016x}"')
+                _snapshot_cache.set(key, cached)
+    return cached
+
+def _snapshot_response(request: Request, response: Response, payload: Dict[str, Any], etag: str):
+    """Answer a conditional request with 304, otherwise attach the caching headers to the payload"""
+    headers = {"ETag": etag, **SNAPSHOT_CACHE_HEADERS}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    response.headers.update(headers)
+    return payload
+
+async def refresh_security_summary() -> None:
+    """Refresh the summary materialized view (CONCURRENTLY keeps it readable meanwhile)"""
+    global _summary_refresh_pending
+    try:
+        async with AsyncSessionLocal() as session:
+            await session.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY network_security_summary"))
+            await session.commit()
+    except Exception as e:
+        logger.error("Error refreshing network security summary view: %s", e)
+    finally:
+        _summary_refresh_pending = False
+
+def _coin_flips(probability: float, count: int) -> List[bool]:
+    """Draw count booleans that are each True with the given probability, in one call"""
+    return random.choices((True, False), weights=(probability, 1.0 - probability), k=count)
+
+@lru_cache(maxsize=256)
+def _node_type_id(device_type: Optional[str]) -> int:
+    """Classify a device type as a topology node type id (memoized; device types repeat a lot)"""
+    device_type = (device_type or "").lower()
+    for keyword, type_id in NODE_TYPE_KEYWORDS:
+        if keyword in device_type:
+            return type_id
+    return NT_DEVICE
 
 @router.get("/traffic-stats")
 async def get_network_traffic_stats(
+    request: Request,
+    response: Response,
     time_period: str = Query("1h", description="Time period for statistics (1h, 24h, 7d)"),
     db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_client)
@@ -64,11 +213,27 @@ async def get_network_traffic_stats(
     
     Returns packet counts, protocol distribution, and bandwidth usage
     """
-    # Get all devices to generate realistic device IDs
-    devices_query = await db.execute(
-        text("SELECT hash_id, name, device_type FROM devices LIMIT 50")
+    # Only the known periods are cached, so arbitrary query values can't grow the cache
+    if time_period not in TRAFFIC_SERIES_STEPS:
+        return await _build_traffic_stats(db, time_period)
+    
+    stats, etag = await _cached_snapshot(
+        ("traffic-stats", time_period), lambda: _build_traffic_stats(db, time_period)
     )
-    devices = devices_query.fetchall()
+    return _snapshot_response(request, response, stats, etag)
+
+async def _build_traffic_stats(db: AsyncSession, time_period: str) -> Dict[str, Any]:
+    """Generate the traffic statistics payload for a time period"""
+    # Protocol counts and a sample of devices (for realistic device IDs) in one round trip;
+    # the counts row is always returned, with NULL device columns when there are no devices
+    rows = (await db.execute(TRAFFIC_STATS_STMT)).fetchall()
+    http_count, mqtt_count, coap_count, ws_count = (
+        rows[0].http_count, rows[0].mqtt_count, rows[0].coap_count, rows[0].ws_count
+    )
+    devices = [
+        {"hash_id": row.hash_id, "name": row.name, "device_type": row.device_type}
+        for row in rows if row.hash_id is not None
+    ]
     
     # If no devices, generate random data
     if not devices:
@@ -83,10 +248,6 @@ async def get_network_traffic_stats(
     outgoing_packets = total_packets - incoming_packets
     
     # Protocol distribution based on device capabilities in DB
-    http_count = (await db.execute(text("SELECT COUNT(*) FROM devices WHERE supports_http = true"))).scalar() or 0
-    mqtt_count = (await db.execute(text("SELECT COUNT(*) FROM devices WHERE supports_mqtt = true"))).scalar() or 0
-    coap_count = (await db.execute(text("SELECT COUNT(*) FROM devices WHERE supports_coap = true"))).scalar() or 0
-    ws_count = (await db.execute(text("SELECT COUNT(*) FROM devices WHERE supports_websocket = true"))).scalar() or 0
     total_supported = http_count + mqtt_count + coap_count + ws_count
     protocol_distribution = {}
     if total_supported > 0:
@@ -98,65 +259,38 @@ async def get_network_traffic_stats(
         protocol_distribution = {'HTTP': 0, 'MQTT': 0, 'CoAP': 0, 'WebSocket': 0}
     
     # Generate time-series data
-    time_points = 24  # 24 data points
-    if time_period == "24h":
-        interval = "hourly"
-    elif time_period == "7d":
-        interval = "daily"
-        time_points = 7
-    else:  # 1h default
-        interval = "5-minute"
-        time_points = 12
-    
-    traffic_series = []
+    time_points, step = TRAFFIC_SERIES_STEPS.get(time_period, TRAFFIC_SERIES_STEPS["1h"])
+    
     current_time = datetime.utcnow()
+    point_times = [current_time - step * (time_points - i - 1) for i in range(time_points)]
     
-    for i in range(time_points):
-        if interval == "hourly":
-            point_time = current_time - timedelta(hours=time_points-i-1)
-        elif interval == "daily":
-            point_time = current_time - timedelta(days=time_points-i-1)
-        else:
-            point_time = current_time - timedelta(minutes=(time_points-i-1)*5)
-            
-        # Generate random traffic with some pattern (higher during work hours)
-        hour = point_time.hour
-        time_factor = 1.0
-        if 9 <= hour <= 17:  # Higher traffic during work hours
-            time_factor = 1.5
-        elif 0 <= hour <= 5:  # Lower traffic at night
-            time_factor = 0.3
-            
-        volume = int(random.normalvariate(5000, 1000) * time_factor)
-        volume = max(100, volume)  # Ensure positive values
-        
-        traffic_series.append({
+    # Random traffic with some pattern (higher during work hours, lower at night),
+    # floored at 100 to keep values positive
+    volumes = [
+        max(100, int(random.normalvariate(5000, 1000) * _HOURLY_TRAFFIC_FACTORS[point_time.hour]))
+        for point_time in point_times
+    ]
+    
+    traffic_series = [
+        {
             "timestamp": point_time.isoformat(),
             "volume": volume,
             "packets": int(volume * random.uniform(0.8, 1.2))
-        })
-    
-    # Top talkers (devices with most traffic)
-    top_talkers = []
-    random.shuffle(devices)
-    for i, device in enumerate(devices[:5]):
-        # Result rows from raw SQL are returned as tuples; simulated entries are dicts
-        if isinstance(device, (list, tuple)):
-            device_id, device_name = device[0], device[1]
-        elif isinstance(device, dict):
-            device_id, device_name = device.get("hash_id"), device.get("name")
-        else:
-            # Fallback – attempt attribute access
-            device_id = getattr(device, "hash_id", None)
-            device_name = getattr(device, "name", str(device))
-        
-        top_talkers.append({
-            "device_id": device_id,
-            "device_name": device_name,
+        }
+        for point_time, volume in zip(point_times, volumes)
+    ]
+    
+    # Top talkers (devices with most traffic): up to five random devices
+    top_talkers = [
+        {
+            "device_id": device["hash_id"],
+            "device_name": device["name"],
             "packets_sent": random.randint(1000, 50000),
             "packets_received": random.randint(1000, 50000),
-            "bandwidth_usage": f"{random.uniform(0.1, 10):.2f} MB"
-        })
+            "bandwidth_usage": random.choice(_TALKER_BANDWIDTHS)
+        }
+        for device in random.sample(devices, min(5, len(devices)))
+    ]
     
     return {
         "total_packets": total_packets,
@@ -175,6 +309,7 @@ async def get_security_events(
     time_period: str = Query("24h", description="Time period for events (1h, 24h, 7d)"),
     severity: Optional[str] = Query(None, description="Filter by severity (low, medium, high)"),
     limit: int = Query(10, ge=1, le=100),
+    background_tasks: BackgroundTasks = BackgroundTasks(),
     db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_client)
 ):
@@ -184,10 +319,11 @@ async def get_security_events(
     Returns detected anomalies, potential attacks, and security alerts
     """
     # Get some real device IDs if available
-    devices_query = await db.execute(
-        text("SELECT hash_id, name, device_type FROM devices LIMIT 50")
-    )
-    devices = devices_query.fetchall()
+    devices_query = await db.execute(DEVICES_SAMPLE_STMT)
+    devices = [
+        {"hash_id": row.hash_id, "name": row.name, "device_type": row.device_type}
+        for row in devices_query
+    ]
     
     if not devices:
         devices = [
@@ -207,54 +343,57 @@ async def get_security_events(
         event_count = random.randint(0, 5)
     
     # Generate security events
-    security_events = []
     notification_triggered = False  # Track if we've already sent a notification this session
     
-    for _ in range(min(event_count, limit)):
-        # Random timestamp within the period
-        event_time = start_time + timedelta(
-            seconds=random.randint(0, int((datetime.utcnow() - start_time).total_seconds()))
-        )
-        
-        # Select random attack type
-        attack_key = random.choice(list(ATTACK_TYPES.keys()))
-        attack = ATTACK_TYPES[attack_key]
-        
-        # Skip if filtering by severity and doesn't match
-        if severity and attack["risk_level"] != severity:
-            continue
-            
-        # Select random source and target
-        source_idx = random.randint(0, len(devices)-1)
-        target_idx = random.randint(0, len(devices)-1)
-        while target_idx == source_idx:
-            target_idx = random.randint(0, len(devices)-1)
-            
+    # Draw each random field for all events up front (one call per field),
+    # then assemble the events in a single pass
+    # With a severity filter only matching attack types are drawn, so every event is kept
+    attack_pool = ATTACK_ROWS_BY_SEVERITY.get(severity, ()) if severity else ATTACK_ROWS
+    n = min(event_count, limit) if attack_pool else 0
+    span_seconds = int((datetime.utcnow() - start_time).total_seconds())
+    device_indexes = range(len(devices))
+    attack_rows = random.choices(attack_pool, k=n)
+    source_idxs = random.choices(device_indexes, k=n)
+    protocols = random.choices(PROTOCOLS, k=n)
+    actions = random.choices(("blocked", "logged", "alerted"), k=n)
+    
+    # Source and target must differ: offset the source by 1..N-1 (mod N), which is
+    # uniform over the other devices and needs a single draw per event
+    device_total = len(devices)
+    if device_total > 1:
+        target_idxs = [
+            (source_idx + 1 + random.randrange(device_total - 1)) % device_total
+            for source_idx in source_idxs
+        ]
+    else:
+        target_idxs = source_idxs
+    
+    security_events = []
+    for attack_row, source_idx, target_idx, protocol, action in zip(
+        attack_rows, source_idxs, target_idxs, protocols, actions
+    ):
+        attack_key, attack_name, attack_description, attack_severity, remediation = attack_row
         source = devices[source_idx]
         target = devices[target_idx]
-        
-        source_id = source[0] if isinstance(source, tuple) else source["hash_id"]
-        source_name = source[1] if isinstance(source, tuple) else source["name"]
-        target_id = target[0] if isinstance(target, tuple) else target["hash_id"]
-        target_name = target[1] if isinstance(target, tuple) else target["name"]
+        source_id, source_name = source["hash_id"], source["name"]
         
         # Generate random source IP (sometimes external, sometimes internal)
         if random.random() < 0.3:  # 30% chance of external IP
-            source_ip = f"{random.randint(1, 223)}.{random.randint(0, 255)}.{random.randint(0, 255)}.{random.randint(0, 255)}"
+            source_ip = random.choice(_EXTERNAL_IPS)
             source_id = None
             source_name = "External Actor"
         else:
-            source_ip = f"192.168.{random.randint(0, 5)}.{random.randint(1, 254)}"
+            source_ip = random.choice(_INTERNAL_IPS)
             
-        target_ip = f"192.168.{random.randint(0, 5)}.{random.randint(1, 254)}"
+        target_ip = random.choice(_INTERNAL_IPS)
         
         security_events.append({
             "id": f"SEC-{random.randint(10000, 99999)}",
-            "timestamp": event_time.isoformat(),
+            "timestamp": start_time + timedelta(seconds=random.randint(0, span_seconds)),
             "event_type": attack_key,
-            "name": attack["name"],
-            "description": attack["description"],
-            "severity": attack["risk_level"],
+            "name": attack_name,
+            "description": attack_description,
+            "severity": attack_severity,
             "source": {
                 "device_id": source_id,
                 "device_name": source_name,
@@ -262,15 +401,15 @@ async def get_security_events(
                 "port": random.randint(1024, 65535)
             },
             "target": {
-                "device_id": target_id,
-                "device_name": target_name,
+                "device_id": target["hash_id"],
+                "device_name": target["name"],
                 "ip": target_ip,
                 "port": random.randint(1, 1024) if random.random() < 0.7 else random.randint(1024, 65535)
             },
-            "protocol": random.choice(PROTOCOLS),
+            "protocol": protocol,
             "packet_count": random.randint(10, 1000),
-            "action_taken": random.choice(["blocked", "logged", "alerted"]),
-            "remediation": attack["remediation"]
+            "action_taken": action,
+            "remediation": remediation
         })
     
     # Sort by timestamp (newest first)
@@ -284,26 +423,20 @@ async def get_security_events(
                 # Select the most recent high severity event
                 event = high_severity_events[0]
                 # Only send notification for events that appear to be happening "now" (in the last hour)
-                event_time = datetime.fromisoformat(event['timestamp'])
-                if (datetime.utcnow() - event_time) < timedelta(hours=1):
-                    await NotificationHelper.notify_security_event(
-                        db=db,
-                        event_type=event['name'],
-                        source_ip=event['source']['ip'],
-                        target_ip=event['target']['ip'],
-                        severity='high'
-                    )
+                if (datetime.utcnow() - event['timestamp']) < timedelta(hours=1):
+                    # Delivery (in-app plus email for high severity) runs after the response is sent
+                    background_tasks.add_task(_notify_security_event, event)
                     notification_triggered = True
-                    logger.info(f"Triggered notification for security event: {event['id']}")
             except Exception as e:
-                logger.error(f"Error sending security event notification: {str(e)}")
+                logger.error("Error scheduling security event notification: %s", e)
     
-    return {
+    # Rendered directly (timestamps included) instead of going through jsonable_encoder
+    return FastJSONResponse({
         "total_events": event_count,
         "events": security_events[:limit],
         "time_period": time_period,
-        "analysis_timestamp": datetime.utcnow().isoformat()
-    }
+        "analysis_timestamp": datetime.utcnow()
+    })
 
 @router.get("/network-topology")
 async def get_network_topology(
@@ -316,48 +449,35 @@ async def get_network_topology(
     Returns nodes (devices) and edges (connections) for visualization
     """
     # Get devices from database
-    devices_query = await db.execute(
-        text("SELECT hash_id, name, device_type FROM devices")
-    )
+    devices_query = await db.execute(DEVICES_ALL_STMT)
+    # (hash_id, name, device_type) rows
     devices = devices_query.fetchall()
     
     if not devices:
         # Generate dummy devices if none exist
         devices = [
-            {"hash_id": f"sim_{i}", "name": f"Simulated Device {i}", "device_type": random.choice(["sensor", "gateway", "controller"])}
+            (f"sim_{i}", f"Simulated Device {i}", random.choice(["sensor", "gateway", "controller"]))
             for i in range(1, 20)
         ]
     
-    # Create nodes
-    nodes = []
-    for device in devices:
-        if isinstance(device, dict):
-            # Dummy or JSON-derived device
-            device_id = device["hash_id"]
-            device_name = device["name"]
-            device_type = device["device_type"]
-        else:
-            # SQLAlchemy Row result
-            device_id = getattr(device, "hash_id", None)
-            device_name = getattr(device, "name", None)
-            device_type = getattr(device, "device_type", None)
-        
-        # Determine node type based on device type
-        node_type = "device"
-        if "gateway" in device_type.lower():
-            node_type = "gateway"
-        elif "controller" in device_type.lower():
-            node_type = "controller"
-        elif "sensor" in device_type.lower():
-            node_type = "sensor"
-        
-        nodes.append({
+    # Create nodes, with the node type based on the device type
+    node_type_ids = [_node_type_id(device_type) for _, _, device_type in devices]
+    nodes = [
+        {
             "id": device_id,
             "name": device_name,
-            "type": node_type,
+            "type": NODE_TYPE_NAMES[type_id],
             "status": random.choice(["online", "online", "online", "offline"]),  # 75% chance of being online
-            "ip_address": f"192.168.{random.randint(0, 5)}.{random.randint(1, 254)}"
-        })
+            "ip_address": random.choice(_INTERNAL_IPS)
+        }
+        for (device_id, device_name, _), type_id in zip(devices, node_type_ids)
+    ]
+    
+    # Bucket the device nodes by type id for edge generation
+    buckets = tuple([] for _ in NODE_TYPE_NAMES)
+    for node, type_id in zip(nodes, node_type_ids):
+        buckets[type_id].append(node)
+    generic_devices, gateways, controllers, sensors = buckets
     
     # Add router and internet nodes
     nodes.append({
@@ -376,14 +496,11 @@ async def get_network_topology(
         "ip_address": "external"
     })
     
-    # Create edges (connections)
+    # Create edges (connections), based on the node type buckets. Every random field is
+    # drawn for a whole bucket with one call, so the loops only assemble dicts
     edges = []
-    
-    # Connect devices based on type
-    gateways = [node for node in nodes if node["type"] == "gateway"]
-    controllers = [node for node in nodes if node["type"] == "controller"]
-    sensors = [node for node in nodes if node["type"] == "sensor"]
-    devices = [node for node in nodes if node["type"] == "device"]
+    gateway_ids = [gateway["id"] for gateway in gateways]
+    controller_ids = [controller["id"] for controller in controllers]
     
     # Connect router to internet
     edges.append({
@@ -391,87 +508,102 @@ async def get_network_topology(
         "target": "internet",
         "type": "wan",
         "status": "active",
-        "bandwidth": f"{random.randint(50, 100)} Mbps",
+        "bandwidth": random.choice(_MBPS_LABELS[50:]),
         "protocol": "TCP/IP"
     })
     
     # Connect gateways to router
-    for gateway in gateways:
+    n = len(gateways)
+    for gateway, bandwidth, protocol in zip(
+        gateways,
+        random.choices(_MBPS_LABELS[10:], k=n),
+        random.choices(("Ethernet", "WiFi", "Ethernet"), k=n)
+    ):
         edges.append({
             "source": gateway["id"],
             "target": "router_1",
             "type": "lan",
             "status": "active" if gateway["status"] == "online" else "inactive",
-            "bandwidth": f"{random.randint(10, 100)} Mbps",
-            "protocol": random.choice(["Ethernet", "WiFi", "Ethernet"])
+            "bandwidth": bandwidth,
+            "protocol": protocol
         })
     
-    # Connect controllers to router or gateways
-    for controller in controllers:
-        if gateways and random.random() < 0.7:  # 70% connect to gateway
-            target = random.choice(gateways)
-            edge_type = "local"
-        else:
-            target = {"id": "router_1"}
-            edge_type = "lan"
-            
+    # Connect controllers to router or gateways (70% to a gateway when there are any)
+    n = len(controllers)
+    for controller, via_gateway, gateway_id, bandwidth, protocol in zip(
+        controllers,
+        _coin_flips(0.7 if gateways else 0.0, n),
+        random.choices(gateway_ids or ["router_1"], k=n),
+        random.choices(_MBPS_LABELS[1:11], k=n),
+        random.choices(("WiFi", "Ethernet", "Zigbee"), k=n)
+    ):
         edges.append({
             "source": controller["id"],
-            "target": target["id"],
-            "type": edge_type,
+            "target": gateway_id if via_gateway else "router_1",
+            "type": "local" if via_gateway else "lan",
             "status": "active" if controller["status"] == "online" else "inactive",
-            "bandwidth": f"{random.randint(1, 10)} Mbps",
-            "protocol": random.choice(["WiFi", "Ethernet", "Zigbee"])
+            "bandwidth": bandwidth,
+            "protocol": protocol
         })
     
-    # Connect sensors to controllers or gateways
-    for sensor in sensors:
-        if controllers and random.random() < 0.6:  # 60% connect to controller
-            targets = controllers
-            protocol = random.choice(["Zigbee", "Z-Wave", "BLE"])
+    # Connect sensors to controllers (60% when there are any), otherwise to gateways,
+    # and to the router only when there are neither
+    n = len(sensors)
+    for sensor, via_controller, controller_id, gateway_id, protocol_idx, bandwidth in zip(
+        sensors,
+        _coin_flips(0.6 if controllers else 0.0, n),
+        random.choices(controller_ids or [None], k=n),
+        random.choices(gateway_ids or [None], k=n),
+        random.choices(range(3), k=n),
+        random.choices(_KBPS_LABELS, k=n)
+    ):
+        if via_controller:
+            target, protocol = controller_id, _CONTROLLER_LINK_PROTOCOLS[protocol_idx]
         elif gateways:
-            targets = gateways
-            protocol = random.choice(["WiFi", "Zigbee", "Z-Wave"])
+            target, protocol = gateway_id, _GATEWAY_LINK_PROTOCOLS[protocol_idx]
         else:
-            targets = [{"id": "router_1"}]
-            protocol = "WiFi"
-            
-        target = random.choice(targets)
+            target, protocol = "router_1", "WiFi"
+        
         edges.append({
             "source": sensor["id"],
-            "target": target["id"],
+            "target": target,
             "type": "sensor",
             "status": "active" if sensor["status"] == "online" else "inactive",
-            "bandwidth": f"{random.randint(100, 1000)} Kbps",
+            "bandwidth": bandwidth,
             "protocol": protocol
         })
     
-    # Connect other devices
-    for device in devices:
-        if random.random() < 0.3 and gateways:  # 30% to gateway
-            target = random.choice(gateways)
-            protocol = random.choice(["WiFi", "Ethernet"])
-        else:
-            target = {"id": "router_1"}
-            protocol = random.choice(["WiFi", "Ethernet"])
-            
+    # Connect other devices (30% to a gateway when there are any)
+    n = len(generic_devices)
+    for device, via_gateway, gateway_id, bandwidth, protocol in zip(
+        generic_devices,
+        _coin_flips(0.3 if gateways else 0.0, n),
+        random.choices(gateway_ids or ["router_1"], k=n),
+        random.choices(_MBPS_LABELS[1:51], k=n),
+        random.choices(("WiFi", "Ethernet"), k=n)
+    ):
         edges.append({
             "source": device["id"],
-            "target": target["id"],
+            "target": gateway_id if via_gateway else "router_1",
             "type": "device",
             "status": "active" if device["status"] == "online" else "inactive",
-            "bandwidth": f"{random.randint(1, 50)} Mbps",
+            "bandwidth": bandwidth,
             "protocol": protocol
         })
     
-    return {
+    # Rendered directly instead of going through jsonable_encoder; large networks
+    # produce hundreds of nodes and edges
+    return FastJSONResponse({
         "nodes": nodes,
         "edges": edges,
-        "last_updated": datetime.utcnow().isoformat()
-    }
+        "last_updated": datetime.utcnow()
+    })
 
 @router.get("/summary")
 async def get_network_security_summary(
+    request: Request,
+    response: Response,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_client)
 ):
@@ -480,11 +612,24 @@ async def get_network_security_summary(
     
     Combines traffic statistics, security events, and assessment scores
     """
-    # Get count of online devices
-    device_count_query = await db.execute(
-        text("SELECT COUNT(*) FROM devices")
+    summary, etag = await _cached_snapshot(
+        "summary", lambda: _build_security_summary(db, background_tasks)
     )
-    device_count = device_count_query.scalar() or random.randint(5, 50)
+    return _snapshot_response(request, response, summary, etag)
+
+async def _build_security_summary(db: AsyncSession, background_tasks: BackgroundTasks) -> Dict[str, Any]:
+    """Generate the network security summary payload"""
+    global _summary_refresh_pending
+    
+    # Device and vulnerability counts, pre-aggregated in a single-row view
+    counts = (await db.execute(select(network_security_summary))).one()
+    if (
+        not _summary_refresh_pending
+        and datetime.utcnow() - counts.refreshed_at > SUMMARY_REFRESH_INTERVAL
+    ):
+        _summary_refresh_pending = True
+        background_tasks.add_task(refresh_security_summary)
+    device_count = counts.device_count or random.randint(5, 50)
     
     # Generate security score (0-100)
     security_score = random.randint(70, 95)
@@ -516,13 +661,14 @@ async def get_network_security_summary(
         "anomalous_traffic_percent": round(random.uniform(0, 5), 2)
     }
     
-    # Generate vulnerability stats
+    # Vulnerability stats from the summary view
     vulnerability_summary = {
-        "total_vulnerabilities": random.randint(0, device_count * 2),
-        "critical": random.randint(0, 5),
-        "high": random.randint(0, 10),
-        "medium": random.randint(0, 15),
-        "low": random.randint(0, 20),
+        "total_vulnerabilities": counts.total_vulnerabilities,
+        "critical": counts.critical,
+        "high": counts.high,
+        "medium": counts.medium,
+        "low": counts.low,
+        # Remediation isn't tracked yet
         "remediated_last_7d": random.randint(0, 10)
     }
     
@@ -1,76 +1,131 @@
 """API endpoints for notification management"""
 import logging
 from typing import List, Dict, Any, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, Path
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Depends, HTTPException, Query, Path, Request, Response
+from sqlalchemy.exc import DataError, IntegrityError
 
-from app.api.deps import get_current_client
+from app.api.deps import get_current_client, get_notification_service
 
 from app.api import schemas
-from app.models.database import get_db
+from app.api.utils import conditional_response, iter_json_array, start_json_stream
+from app.models.database import AsyncSessionLocal
 from app.services.messaging_service import NotificationService
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-@router.get("/", response_model=List[schemas.NotificationResponse])
+# Failures caused by the request itself (bad values, unknown client ids); these are
+# answered with a 400 and logged without a traceback, unlike unexpected errors
+EXPECTED_ERRORS = (ValueError, DataError, IntegrityError)
+
+# Listings larger than this are streamed row by row instead of built in memory
+NOTIFICATIONS_STREAM_THRESHOLD = 100
+
+def _notification_json(notification) -> Dict[str, Any]:
+    """Shape a notification exactly as the NotificationResponse list endpoints do"""
+    return schemas.NotificationResponse.model_validate(notification).model_dump(mode="json", exclude_none=True)
+
+async def _stream_notifications(query):
+    """Stream a notification listing as a JSON array"""
+    # The request-scoped session is closed before a streamed body is sent,
+    # so the generator owns its session for the lifetime of the stream
+    async with AsyncSessionLocal() as session:
+        result = await session.stream_scalars(query.execution_options(yield_per=200))
+        try:
+            async for chunk in iter_json_array(result, _notification_json):
+                yield chunk
+        except Exception as e:
+            logger.error("Error streaming notifications: %s", e)
+            raise
+
+@router.get("/", response_model=List[schemas.NotificationResponse], response_model_exclude_none=True)
 async def get_notifications(
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
-    db: AsyncSession = Depends(get_db)
+    before_id: Optional[int] = Query(None, gt=0, description="Return notifications older than this one (keyset cursor)"),
+    notification_service: NotificationService = Depends(get_notification_service)
 ):
     """
     Get all notifications with pagination
+    
+    Pages larger than NOTIFICATIONS_STREAM_THRESHOLD are streamed: rows are shaped
+    by _notification_json rather than validated against response_model, and since
+    the query is opened before the response starts only errors after that point
+    (which truncate the body) escape the 500 handling below.
     """
     try:
-        notification_service = NotificationService(db)
-        notifications = await notification_service.get_all_notifications(limit=limit, offset=offset)
+        if limit > NOTIFICATIONS_STREAM_THRESHOLD:
+            return await start_json_stream(
+                _stream_notifications(NotificationService.all_notifications_query(limit, offset, before_id))
+            )
+        
+        notifications = await notification_service.get_all_notifications(
+            limit=limit, offset=offset, before_id=before_id
+        )
         return notifications
     except Exception as e:
-        logger.error(f"Error retrieving notifications: {str(e)}", exc_info=True)
+        logger.error("Error retrieving notifications: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error retrieving notifications: {str(e)}")
 
-@router.get("/unread", response_model=List[schemas.NotificationResponse])
+@router.get("/unread", response_model=List[schemas.NotificationResponse], response_model_exclude_none=True)
 async def get_unread_notifications(
-    db: AsyncSession = Depends(get_db),
+    notification_service: NotificationService = Depends(get_notification_service),
     current_user = Depends(get_current_client)
 ):
     """
     Get all unread notifications
     """
-    notification_service = NotificationService(db)
     notifications = await notification_service.get_unread_notifications()
     return notifications
 
+@router.get("/filter", response_model=List[schemas.NotificationResponse], response_model_exclude_none=True)
+async def filter_notifications(
+    filter_params: schemas.NotificationFilter = Depends(),
+    notification_service: NotificationService = Depends(get_notification_service)
+):
+    """
+    Filter notifications by various parameters
+    """
+    return await notification_service.filter_notifications(**filter_params.model_dump(exclude_none=True))
+
 @router.get("/{notification_id}", response_model=schemas.NotificationResponse)
 async def get_notification(
+    request: Request,
+    response: Response,
     notification_id: int = Path(..., gt=0),
-    db: AsyncSession = Depends(get_db)
+    notification_service: NotificationService = Depends(get_notification_service)
 ):
     """
     Get a specific notification by ID
     """
-    notification_service = NotificationService(db)
     notification = await notification_service.get_notification_by_id(notification_id)
     
     if not notification:
         raise HTTPException(status_code=404, detail="Notification not found")
     
+    # Unchanged notifications answer conditional requests without serializing
+    etag = f'W/"{notification.id}-{notification.updated_at.isoformat()}"'
+    not_modified = conditional_response(request, response, etag)
+    if not_modified is not None:
+        return not_modified
+    
     return notification
 
 @router.post("/", response_model=schemas.NotificationResponse)
 async def create_notification(
     notification_data: schemas.NotificationCreate,
-    db: AsyncSession = Depends(get_db)
+    notification_service: NotificationService = Depends(get_notification_service)
 ):
     """
     Create a new notification
     """
-    notification_service = NotificationService(db)
-    
     try:
-        # Log the input parameters for debugging
-        logger.info(f"Creating notification with data: {notification_data.dict()}")
+        # Log the input parameters for debugging; only dump the model when INFO is enabled
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Creating notification: %s",
+                notification_data.model_dump(exclude={"content"}, exclude_none=True)
+            )
         
         notification = await notification_service.create_notification(
             title=notification_data.title,
@@ -89,20 +144,23 @@ async def create_notification(
         
         return notification
     
+    except HTTPException:
+        raise
+    except EXPECTED_ERRORS as e:
+        logger.warning("Error creating notification: %s", e)
+        raise HTTPException(status_code=400, detail=f"Error creating notification: {str(e)}")
     except Exception as e:
-        logger.error(f"Error creating notification: {str(e)}", exc_info=True)
+        logger.error("Error creating notification: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error creating notification: {str(e)}")
 
 @router.post("/{notification_id}/mark-read", response_model=schemas.NotificationResponse)
 async def mark_notification_as_read(
     notification_id: int = Path(..., gt=0),
-    db: AsyncSession = Depends(get_db)
+    notification_service: NotificationService = Depends(get_notification_service)
 ):
     """
     Mark a notification as read
     """
-    notification_service = NotificationService(db)
-    
     notification = await notification_service.mark_as_read(notification_id)
     if not notification:
         raise HTTPException(status_code=404, detail="Notification not found")
@@ -111,13 +169,11 @@ async def mark_notification_as_read(
 
 @router.post("/mark-all-read", response_model=schemas.Response)
 async def mark_all_notifications_as_read(
-    db: AsyncSession = Depends(get_db)
+    notification_service: NotificationService = Depends(get_notification_service)
 ):
     """
     Mark all unread notifications as read
     """
-    notification_service = NotificationService(db)
-    
     count = await notification_service.mark_all_as_read()
     
     return schemas.Response(
@@ -128,13 +184,11 @@ async def mark_all_notifications_as_read(
 @router.delete("/{notification_id}", response_model=schemas.Response)
 async def delete_notification(
     notification_id: int = Path(..., gt=0),
-    db: AsyncSession = Depends(get_db)
+    notification_service: NotificationService = Depends(get_notification_service)
 ):
     """
     Delete a notification
     """
-    notification_service = NotificationService(db)
-    
     success = await notification_service.delete_notification(notification_id)
     if not success:
         raise HTTPException(status_code=404, detail="Notification not found")
@@ -147,13 +201,11 @@ async def delete_notification(
 @router.post("/clear-old", response_model=schemas.Response)
 async def clear_old_notifications(
     days_to_keep: int = Query(30, ge=1, le=365),
-    db: AsyncSession = Depends(get_db)
+    notification_service: NotificationService = Depends(get_notification_service)
 ):
     """
     Delete notifications older than the specified number of days
     """
-    notification_service = NotificationService(db)
-    
     count = await notification_service.delete_old_notifications(days_to_keep=days_to_keep)
     
     return schemas.Response(
@@ -161,80 +213,15 @@ async def clear_old_notifications(
         message=f"Deleted {count} old notifications"
     )
 
-@router.get("/filter", response_model=List[schemas.NotificationResponse])
-async def filter_notifications(
-    filter_params: schemas.NotificationFilter = Depends(),
-    db: AsyncSession = Depends(get_db)
-):
-    """
-    Filter notifications by various parameters
-    """
-    notification_service = NotificationService(db)
-    
-    # This would typically call a service method, but we'll implement it directly here
-    # since we don't have a specific filtering method in the service
-    
-    query = f"""
-    SELECT n.* 
-    FROM notifications n
-    WHERE 1=1
-    """
-    params = {}
-    
-    if filter_params.notification_type:
-        query += " AND n.notification_type = :notification_type"
-        params["notification_type"] = filter_params.notification_type
-        
-    if filter_params.source:
-        query += " AND n.source = :source"
-        params["source"] = filter_params.source
-        
-    if filter_params.source_id is not None:
-        query += " AND n.source_id = :source_id"
-        params["source_id"] = filter_params.source_id
-        
-    if filter_params.target_type:
-        query += " AND n.target_type = :target_type"
-        params["target_type"] = filter_params.target_type
-        
-    if filter_params.target_id is not None:
-        query += " AND n.target_id = :target_id"
-        params["target_id"] = filter_params.target_id
-        
-    if filter_params.priority is not None:
-        query += " AND n.priority = :priority"
-        params["priority"] = filter_params.priority
-        
-    if filter_params.is_read is not None:
-        query += " AND n.is_read = :is_read"
-        params["is_read"] = filter_params.is_read
-        
-    if filter_params.start_time:
-        query += " AND n.created_at >= :start_time"
-        params["start_time"] = filter_params.start_time
-        
-    if filter_params.end_time:
-        query += " AND n.created_at <= :end_time"
-        params["end_time"] = filter_params.end_time
-        
-    query += " ORDER BY n.created_at DESC LIMIT :limit OFFSET :skip"
-    params["limit"] = filter_params.limit
-    params["skip"] = filter_params.skip
-    
-    result = await db.execute(query, params)
-    return result.all()
-
 @router.post("/with-clients", response_model=schemas.NotificationResponse)
 async def create_notification_with_clients(
     notification_data: schemas.NotificationWithClientsCreate,
-    db: AsyncSession = Depends(get_db)
+    notification_service: NotificationService = Depends(get_notification_service)
 ):
     """
     Create a new notification with client relationships
     """
     try:
-        notification_service = NotificationService(db)
-        
         notification = await notification_service.create_notification_with_clients(
             title=notification_data.title,
             content=notification_data.content,
@@ -250,9 +237,15 @@ async def create_notification_with_clients(
             metadata=notification_data.metadata
         )
         
-        return notification.to_dict()
+        # Validated once against NotificationResponse straight from the ORM object
+        return notification
+    except HTTPException:
+        raise
+    except EXPECTED_ERRORS as e:
+        logger.warning("Failed to create notification: %s", e)
+        raise HTTPException(status_code=400, detail=f"Failed to create notification: {str(e)}")
     except Exception as e:
-        logger.error(f"Error creating notification with clients: {str(e)}", exc_info=True)
+        logger.error("Error creating notification with clients: %s", e, exc_info=True)
         raise HTTPException(
             status_code=500,
             detail=f"Failed to create notification: {str(e)}"
@@ -260,11 +253,10 @@ async def create_notification_with_clients(
 
 @router.post("/test-sms")
 async def test_sms_notification(
-    db: AsyncSession = Depends(get_db)
+    notification_service: NotificationService = Depends(get_notification_service)
 ):
     """Test endpoint for SMS notifications"""
     try:
-        notification_service = NotificationService(db)
         notification = await notification_service.create_notification(
             title="Test SMS Notification",
             content="This is a test SMS notification from the IoT Platform",
@@ -274,8 +266,13 @@ async def test_sms_notification(
             priority=3
         )
         return {"message": "SMS notification sent", "notification": notification}
+    except HTTPException:
+        raise
+    except EXPECTED_ERRORS as e:
+        logger.warning("Error sending test SMS: %s", e)
+        raise HTTPException(status_code=400, detail=f"Error sending test SMS: {str(e)}")
     except Exception as e:
-        logger.error(f"Error sending test SMS: {str(e)}", exc_info=True)
+        logger.error("Error sending test SMS: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error sending test SMS: {str(e)}")
 
 @router.post("/simulate/trigger")
@@ -287,7 +284,7 @@ async def simulate_notification_trigger(
     recipients: List[str] = Query(...),
     priority: int = Query(3, ge=1, le=5),
     metadata: Optional[Dict[str, Any]] = None,
-    db: AsyncSession = Depends(get_db)
+    notification_service: NotificationService = Depends(get_notification_service)
 ):
     """
     Simulate a notification trigger
@@ -296,8 +293,6 @@ async def simulate_notification_trigger(
     with custom data
     """
     try:
-        notification_service = NotificationService(db)
-        
         # Create notification
         notification = await notification_service.create_notification(
             title=title,
@@ -309,12 +304,9 @@ async def simulate_notification_trigger(
             metadata=metadata
         )
         
-        # Send notification through all specified channels
-        for channel in channels:
-            try:
-                await notification_service.send_notification(notification.id, channel)
-            except Exception as e:
-                logger.error(f"Error sending notification through {channel}: {str(e)}")
+        # Send notification through all specified channels concurrently
+        # (per-channel failures are logged by the service)
+        await notification_service.send_notification_multi(notification.id, channels)
         
         return {
             "success": True,
@@ -322,6 +314,11 @@ async def simulate_notification_trigger(
             "channels_attempted": channels
         }
         
+    except HTTPException:
+        raise
+    except EXPECTED_ERRORS as e:
+        logger.warning("Error simulating notification trigger: %s", e)
+        raise HTTPException(status_code=400, detail=f"Error simulating notification trigger: {str(e)}")
     except Exception as e:
-        logger.error(f"Error simulating notification trigger: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        logger.error("Error simulating notification trigger: %s", e, exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,44 +1,93 @@
 """Rule management API endpoints"""
+import re
 from typing import List, Dict, Any, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, status, Body
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response, status, Body
 from sqlalchemy.ext.asyncio import AsyncSession
 import logging
 
-from app.models.database import get_db
-from app.services.rule_service import RuleService
+from app.models.database import AsyncSessionLocal, get_db
+from app.services.rule_service import RuleService, RULES_LIST_CACHE_KEY, RULES_LIST_CACHE_TTL
 from app.services.messaging_service import NotificationService
 from app.api.schemas import RuleCreate, RuleUpdate, RuleResponse, RuleEvaluationResponse, RuleData
 from app.api.deps import get_current_client
+from app.api.utils import conditional_response, json_dumps
+from app.utils.shared_cache import shared_cache
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# RuleService reports missing rules, executions and devices with a "... not found" message
+_NOT_FOUND_RE = re.compile(r"not found", re.IGNORECASE)
+
+def _rule_response(
+    result: Dict[str, Any],
+    error_status: int = status.HTTP_500_INTERNAL_SERVER_ERROR,
+    not_found: bool = True
+) -> RuleResponse:
+    """
+    Turn a RuleService result into a RuleResponse, raising HTTPException on errors
+    
+    Args:
+        result: Standardized service result (status, message, data, errors)
+        error_status: Status code used for errors
+        not_found: Whether "not found" errors are reported as 404 instead
+    """
+    if result["status"] == "error":
+        status_code = error_status
+        if not_found and _NOT_FOUND_RE.search(result["message"]):
+            status_code = status.HTTP_404_NOT_FOUND
+        raise HTTPException(status_code=status_code, detail=result["message"])
+    
+    return RuleResponse(
+        status=result["status"],
+        message=result["message"],
+        data=result["data"],
+        errors=result["errors"]
+    )
+
+async def _notify_rule_created(rule: Dict[str, Any], message: str, recipient: str) -> None:
+    """Send the rule creation notification (WebSocket and email) on a dedicated session"""
+    async with AsyncSessionLocal() as session:
+        try:
+            await NotificationService(session).create_notification(
+                title=f"Rule '{rule['name']}' Created",
+                content=message,
+                notification_type='info',
+                source='rule',
+                source_id=rule['id'],
+                target_type='rule',
+                target_id=rule['id'],
+                target_name=rule['name'],
+                channels=['websocket','email'],
+                recipients=[recipient]
+            )
+        except Exception as e:
+            logger.error("Failed to send creation notification: %s", e)
+
 @router.get("/", response_model=RuleResponse)
 async def list_rules(
     db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_client)
 ):
     """List all rules"""
+    # The listing is the same for every client; RuleService drops it on any rule change
+    cached = await shared_cache.get(RULES_LIST_CACHE_KEY)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+    
     rule_service = RuleService(db)
     result = await rule_service.list_rules()
     
-    if result["status"] == "error":
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=result["message"]
-        )
-    
-    return RuleResponse(
-        status=result["status"],
-        message=result["message"],
-        data=result["data"],
-        errors=result["errors"]
-    )
+    response = _rule_response(result, not_found=False)
+    body = json_dumps(response.model_dump(mode="json", exclude_none=True))
+    await shared_cache.set(RULES_LIST_CACHE_KEY, body, ttl=RULES_LIST_CACHE_TTL)
+    return Response(content=body, media_type="application/json")
 
 @router.post("/", response_model=RuleResponse)
 async def create_rule(
     rule_data: RuleCreate,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_client)
 ):
@@ -46,40 +95,18 @@ async def create_rule(
     rule_service = RuleService(db)
     result = await rule_service.create_rule(rule_data.dict())
     
-    if result["status"] == "error":
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=result["message"]
-        )
+    response = _rule_response(result, status.HTTP_400_BAD_REQUEST, not_found=False)
     
-    # Dispatch creation notifications via WebSocket and Email
-    try:
-        notif = NotificationService(db)
-        await notif.create_notification(
-            title=f"Rule '{result['data']['name']}' Created",
-            content=result['message'],
-            notification_type='info',
-            source='rule',
-            source_id=result['data']['id'],
-            target_type='rule',
-            target_id=result['data']['id'],
-            target_name=result['data']['name'],
-            channels=['websocket','email'],
-            recipients=[current_user.email]
-        )
-    except Exception as e:
-        logger.error(f"Failed to send creation notification: {str(e)}")
+    # Send creation notifications after the response so the POST doesn't wait on WebSocket/SMTP
+    background_tasks.add_task(_notify_rule_created, result["data"], result["message"], current_user.email)
     
-    return RuleResponse(
-        status=result["status"],
-        message=result["message"],
-        data=result["data"],
-        errors=result["errors"]
-    )
+    return response
 
 @router.get("/{rule_id}", response_model=RuleResponse)
 async def get_rule(
     rule_id: int,
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_client)
 ):
@@ -87,19 +114,14 @@ async def get_rule(
     rule_service = RuleService(db)
     result = await rule_service.get_rule(rule_id)
     
-    if result["status"] == "error":
-        status_code = status.HTTP_404_NOT_FOUND if "not found" in result["message"].lower() else status.HTTP_500_INTERNAL_SERVER_ERROR
-        raise HTTPException(
-            status_code=status_code,
-            detail=result["message"]
-        )
+    # Unchanged rules answer conditional requests without building the body
+    if result["status"] != "error":
+        etag = f'W/"{rule_id}-{result["data"]["updated_at"]}"'
+        not_modified = conditional_response(request, response, etag)
+        if not_modified is not None:
+            return not_modified
     
-    return RuleResponse(
-        status=result["status"],
-        message=result["message"],
-        data=result["data"],
-        errors=result["errors"]
-    )
+    return _rule_response(result)
 
 @router.put("/{rule_id}", response_model=RuleResponse)
 async def update_rule(
@@ -112,19 +134,7 @@ async def update_rule(
     rule_service = RuleService(db)
     result = await rule_service.update_rule(rule_id, rule_data.dict(exclude_unset=True))
     
-    if result["status"] == "error":
-        status_code = status.HTTP_404_NOT_FOUND if "not found" in result["message"].lower() else status.HTTP_400_BAD_REQUEST
-        raise HTTPException(
-            status_code=status_code,
-            detail=result["message"]
-        )
-    
-    return RuleResponse(
-        status=result["status"],
-        message=result["message"],
-        data=result["data"],
-        errors=result["errors"]
-    )
+    return _rule_response(result, status.HTTP_400_BAD_REQUEST)
 
 @router.delete("/{rule_id}", response_model=RuleResponse)
 async def delete_rule(
@@ -136,19 +146,7 @@ async def delete_rule(
     rule_service = RuleService(db)
     result = await rule_service.delete_rule(rule_id)
     
-    if result["status"] == "error":
-        status_code = status.HTTP_404_NOT_FOUND if "not found" in result["message"].lower() else status.HTTP_500_INTERNAL_SERVER_ERROR
-        raise HTTPException(
-            status_code=status_code,
-            detail=result["message"]
-        )
-    
-    return RuleResponse(
-        status=result["status"],
-        message=result["message"],
-        data=result["data"],
-        errors=result["errors"]
-    )
+    return _rule_response(result)
 
 @router.post("/{rule_id}/enable", response_model=RuleResponse)
 async def enable_rule(
@@ -160,19 +158,7 @@ async def enable_rule(
     rule_service = RuleService(db)
     result = await rule_service.enable_rule(rule_id)
     
-    if result["status"] == "error":
-        status_code = status.HTTP_404_NOT_FOUND if "not found" in result["message"].lower() else status.HTTP_500_INTERNAL_SERVER_ERROR
-        raise HTTPException(
-            status_code=status_code,
-            detail=result["message"]
-        )
-    
-    return RuleResponse(
-        status=result["status"],
-        message=result["message"],
-        data=result["data"],
-        errors=result["errors"]
-    )
+    return _rule_response(result)
 
 @router.post("/{rule_id}/disable", response_model=RuleResponse)
 async def disable_rule(
@@ -184,19 +170,7 @@ async def disable_rule(
     rule_service = RuleService(db)
     result = await rule_service.disable_rule(rule_id)
     
-    if result["status"] == "error":
-        status_code = status.HTTP_404_NOT_FOUND if "not found" in result["message"].lower() else status.HTTP_500_INTERNAL_SERVER_ERROR
-        raise HTTPException(
-            status_code=status_code,
-            detail=result["message"]
-        )
-    
-    return RuleResponse(
-        status=result["status"],
-        message=result["message"],
-        data=result["data"],
-        errors=result["errors"]
-    )
+    return _rule_response(result)
 
 @router.post("/apply", response_model=RuleResponse)
 async def apply_all_rules(
@@ -207,18 +181,7 @@ async def apply_all_rules(
     rule_service = RuleService(db)
     result = await rule_service.apply_all_rules()
     
-    if result["status"] == "error":
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=result["message"]
-        )
-    
-    return RuleResponse(
-        status=result["status"],
-        message=result["message"],
-        data=result["data"],
-        errors=result["errors"]
-    )
+    return _rule_response(result, not_found=False)
 
 @router.post("/device/{device_id}/apply", response_model=RuleResponse)
 async def apply_rules_to_device(
@@ -230,19 +193,7 @@ async def apply_rules_to_device(
     rule_service = RuleService(db)
     result = await rule_service.apply_rules_to_device(device_id)
     
-    if result["status"] == "error":
-        status_code = status.HTTP_404_NOT_FOUND if "not found" in result["message"].lower() else status.HTTP_500_INTERNAL_SERVER_ERROR
-        raise HTTPException(
-            status_code=status_code,
-            detail=result["message"]
-        )
-    
-    return RuleResponse(
-        status=result["status"],
-        message=result["message"],
-        data=result["data"],
-        errors=result["errors"]
-    )
+    return _rule_response(result)
 
 @router.post("/cancel", response_model=RuleResponse)
 async def cancel_all_executions(
@@ -253,18 +204,7 @@ async def cancel_all_executions(
     rule_service = RuleService(db)
     result = await rule_service.cancel_execution()
     
-    if result["status"] == "error":
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=result["message"]
-        )
-    
-    return RuleResponse(
-        status=result["status"],
-        message=result["message"],
-        data=result["data"],
-        errors=result["errors"]
-    )
+    return _rule_response(result, not_found=False)
 
 @router.post("/cancel/{execution_id}", response_model=RuleResponse)
 async def cancel_execution(
@@ -276,19 +216,7 @@ async def cancel_execution(
     rule_service = RuleService(db)
     result = await rule_service.cancel_execution(execution_id)
     
-    if result["status"] == "error":
-        status_code = status.HTTP_404_NOT_FOUND if "not found" in result["message"].lower() else status.HTTP_500_INTERNAL_SERVER_ERROR
-        raise HTTPException(
-            status_code=status_code,
-            detail=result["message"]
-        )
-    
-    return RuleResponse(
-        status=result["status"],
-        message=result["message"],
-        data=result["data"],
-        errors=result["errors"]
-    )
+    return _rule_response(result)
 
 @router.get("/executions", response_model=RuleResponse)
 async def get_active_executions(
@@ -299,15 +227,4 @@ async def get_active_executions(
     rule_service = RuleService(db)
     result = await rule_service.get_active_executions()
     
-    if result["status"] == "error":
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=result["message"]
-        )
-    
-    return RuleResponse(
-        status=result["status"],
-        message=result["message"],
-        data=result["data"],
-        errors=result["errors"]
-    ) 
\ No newline at end of file
+    return _rule_response(result, not_found=False)
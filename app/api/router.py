@@ -13,6 +13,7 @@ from app.api.endpoints.groups import router as groups_router
 from app.api.endpoints.group_security import router as group_security_router
 from app.api.endpoints.security import router as security_router
 from app.api.endpoints.firmware import router as firmware_router
+from app.api.endpoints.firmware_status import router as firmware_status_router
 from app.api.endpoints.network_security import router as network_security_router
 from app.api.endpoints.rules import router as rules_router
 # Removed bulk_operations import to fix syntax error
@@ -40,7 +41,8 @@ api_router.include_router(group_security_router, prefix="/group-security", tags=
 # Security Management - Consolidated vulnerability and remediation endpoints
 api_router.include_router(security_router, prefix="/security", tags=["security", "vulnerability"])
 
-# Firmware Management - Consolidated endpoints
+# Firmware Management - status routes first so /{firmware_id} doesn't capture them
+api_router.include_router(firmware_status_router, prefix="/firmware", tags=["firmware"])
 api_router.include_router(firmware_router, prefix="/firmware", tags=["firmware"])
 api_router.include_router(rules_router, prefix="/rules", tags=["rules"])
 
@@ -1,6 +1,6 @@
 from datetime import datetime
 from typing import Dict, List, Optional, Any, Union
-from pydantic import BaseModel, Field, IPvAnyAddress, EmailStr, validator
+from pydantic import BaseModel, ConfigDict, Field, IPvAnyAddress, EmailStr, validator
 
 # Device schemas
 class DeviceBase(BaseModel):
@@ -101,11 +101,7 @@ class ActivityBase(BaseModel):
     new_state: Optional[Dict[str, Any]] = Field(None, description="State after the action")
     metadata: Optional[Dict[str, Any]] = Field(None, alias="activity_metadata", description="Any additional context data")
     
-    class Config:
-        orm_mode = True
-        allow_population_by_field_name = True
-        populate_by_name = True  # allows alias usage
-        from_attributes = True
+    model_config = ConfigDict(populate_by_name=True, from_attributes=True)  # populate_by_name allows alias usage
 
 class ActivityCreate(ActivityBase):
     user_id: Optional[int] = Field(None, description="ID of the user who performed the action")
@@ -201,40 +197,6 @@ class ResponseModel(BaseModel):
     message: str
     data: Optional[Any] = None
 
-# Group schemas
-class GroupBase(BaseModel):
-    name: str = Field(..., description="Name of the group")
-    description: Optional[str] = Field(None, description="Description of the group")
-    group_type: str = Field("room", description="Type of group (room, location, category, etc.)")
-    attributes: Optional[Dict[str, Any]] = Field(None, description="Additional attributes for the group")
-    icon: Optional[str] = Field(None, description="Icon for the group")
-    color: Optional[str] = Field(None, description="Color code for the group")
-    is_active: Optional[bool] = Field(True, description="Whether the group is active")
-
-class GroupCreate(GroupBase):
-    pass
-
-class GroupUpdate(BaseModel):
-    name: Optional[str] = Field(None, description="Name of the group")
-    description: Optional[str] = Field(None, description="Description of the group")
-    group_type: Optional[str] = Field(None, description="Type of group (room, location, category, etc.)")
-    attributes: Optional[Dict[str, Any]] = Field(None, description="Additional attributes for the group")
-    icon: Optional[str] = Field(None, description="Icon for the group")
-    color: Optional[str] = Field(None, description="Color code for the group")
-    is_active: Optional[bool] = Field(None, description="Whether the group is active")
-
-class GroupResponse(GroupBase):
-    id: int
-    created_at: datetime
-    updated_at: datetime
-    device_count: int
-    
-    class Config:
-        from_attributes = True
-
-class GroupWithDevices(GroupResponse):
-    devices: List[Dict[str, Any]] = Field([], description="Devices in the group")
-
 # Sensor reading schemas
 class SensorReadingBase(BaseModel):
     device_id: int = Field(..., description="ID of the device")
@@ -329,9 +291,12 @@ class GroupUpdate(BaseModel):
 
 class GroupResponse(GroupBase):
     id: int
+    color: Optional[str] = None
     created_at: datetime
     updated_at: datetime
     device_count: Optional[int] = None
+    
+    model_config = ConfigDict(from_attributes=True)
 
 class GroupWithDevices(GroupResponse):
     devices: List[DeviceInDB] = []
@@ -526,8 +491,13 @@ class NotificationFilter(BaseModel):
     source: Optional[str] = None
     source_id: Optional[int] = None
     target_type: Optional[str] = None
-    target_id: Optional[int] = None
+    target_id: Optional[str] = None
     priority: Optional[int] = None
+    is_read: Optional[bool] = None
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+    skip: int = Field(0, ge=0)
+    limit: int = Field(100, ge=1, le=1000)
     
 # Firmware schemas
 class FirmwareBase(BaseModel):
@@ -569,6 +539,11 @@ class FirmwareUpdateBase(BaseModel):
 class FirmwareUpdateCreate(FirmwareUpdateBase):
     pass
 
+class FirmwareUpdateRequest(BaseModel):
+    device_id: str = Field(..., description="Device hash_id to update")
+    firmware_version: str = Field(..., description="Target firmware version")
+    force_update: bool = Field(False, description="Update even if the current version is the same or newer")
+
 class FirmwareUpdateResponse(BaseModel):
     id: str
     device_id: str
@@ -636,6 +611,7 @@ class DeviceStatusResponse(BaseModel):
     is_online: bool
     status: str
     last_seen: Optional[datetime] = None
+    last_updated: Optional[datetime] = None
     uptime: Optional[int] = None
     firmware_version: Optional[str] = None
     metadata: Dict[str, Any] = Field(default_factory=dict)
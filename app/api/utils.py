@@ -1,10 +1,118 @@
 """
 Helper functions for API responses to ensure consistency
 """
-from typing import Any, Dict, List, Optional
+import json
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Dict, List, Optional
 from datetime import datetime
-from fastapi import HTTPException, status
-from fastapi.responses import JSONResponse
+from fastapi import HTTPException, Request, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+
+def json_dumps(data: Any) -> bytes:
+    """
+    Encode data as JSON bytes, using orjson when it is installed
+    
+    Args:
+        data: JSON-serializable data (datetimes are emitted as ISO 8601 strings)
+        
+    Returns:
+        UTF-8 encoded JSON
+    """
+    if orjson is not None:
+        # Non-string keys are stringified, as the stdlib encoder does
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, default=_json_default, separators=(",", ":")).encode()
+
+def _json_default(value: Any) -> Any:
+    """Fallback encoder for types the stdlib json module does not handle"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with json_dumps, so orjson is used when installed
+    
+    Behaves like FastAPI's ORJSONResponse but keeps working without orjson.
+    """
+    
+    def render(self, content: Any) -> bytes:
+        return json_dumps(content)
+
+def conditional_response(
+    request: Request,
+    response: Response,
+    etag: str,
+    cache_control: str = "private, max-age=5"
+) -> Optional[Response]:
+    """
+    Handle If-None-Match for a detail endpoint
+    
+    Args:
+        request: Incoming request
+        response: Response the endpoint returns normally, tagged with the caching headers
+        etag: Entity tag of the current representation
+        cache_control: Cache-Control value sent with both outcomes
+        
+    Returns:
+        A 304 response when the client already holds etag, otherwise None
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
+
+async def iter_json_array(
+    items: AsyncIterable[Any],
+    serialize: Callable[[Any], Any] = lambda item: item
+) -> AsyncIterator[bytes]:
+    """
+    Encode an async iterable as a JSON array one element at a time
+    
+    Args:
+        items: Async iterable of rows/objects to emit
+        serialize: Callable turning each item into JSON-serializable data
+        
+    Yields:
+        Chunks of the JSON array, suitable for a StreamingResponse
+    """
+    yield b"["
+    first = True
+    async for item in items:
+        if not first:
+            yield b","
+        first = False
+        yield json_dumps(serialize(item))
+    yield b"]"
+
+async def start_json_stream(chunks: AsyncIterator[bytes]) -> StreamingResponse:
+    """
+    Wrap a JSON body generator in a StreamingResponse, running it up to its first chunk
+    
+    Body generators open their result set before yielding anything, so connection
+    and query errors are raised here, inside the endpoint, where they still become
+    an error response. Once the first chunk is sent the status is committed, and a
+    later failure can only cut the body short.
+    
+    Args:
+        chunks: Async generator producing the encoded body
+        
+    Returns:
+        StreamingResponse replaying the first chunk, then the rest of the generator
+    """
+    first = await anext(chunks)
+    
+    async def body() -> AsyncIterator[bytes]:
+        yield first
+        async for chunk in chunks:
+            yield chunk
+    
+    return StreamingResponse(body(), media_type="application/json")
 
 def standard_response(
     data: Any = None, 
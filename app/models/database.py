@@ -1,4 +1,9 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+
 from sqlalchemy import create_engine, text, event
+from sqlalchemy.engine import Result
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
@@ -6,11 +11,26 @@ from sqlalchemy.schema import CreateSchema
 
 from config import settings
 
+# Frequent statements are prepared once per connection and then only bound and executed
+_connect_args: Dict[str, Any] = {
+    "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,  # SQLAlchemy-side cache of asyncpg prepared statements
+    "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,  # asyncpg's own per-connection statement cache
+}
+if settings.DB_PGBOUNCER:
+    # pgbouncer can hand each transaction a different server connection, so statement
+    # names must be globally unique instead of asyncpg's per-connection counters
+    _connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid4()}__"
+
 # Create async engine for PostgreSQL
 async_engine = create_async_engine(
     settings.SQLALCHEMY_DATABASE_URI.replace("postgresql://", "postgresql+asyncpg://"),
     echo=False,  # Set to False to avoid duplicate logs
     future=True,
+    query_cache_size=2048,  # Compiled SQL cache shared by all requests
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_pre_ping=True,  # Drop connections the server closed while idle
+    connect_args=_connect_args,
 )
 
 # Create sync engine for migrations and utilities
@@ -29,6 +49,46 @@ AsyncSessionLocal = sessionmaker(
     autoflush=False,
 )
 
+# Parallel queries leave at least one pooled connection for the rest of the app
+PARALLEL_QUERY_LIMIT = max(1, settings.DB_POOL_SIZE - 1)
+
+# Shared by every execute_parallel call so the cap holds process-wide. Created on
+# first use so it belongs to the running event loop rather than the import-time one.
+_parallel_semaphore: Optional[asyncio.Semaphore] = None
+_parallel_semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def _get_parallel_semaphore() -> asyncio.Semaphore:
+    global _parallel_semaphore, _parallel_semaphore_loop
+    loop = asyncio.get_running_loop()
+    if _parallel_semaphore is None or _parallel_semaphore_loop is not loop:
+        _parallel_semaphore = asyncio.Semaphore(PARALLEL_QUERY_LIMIT)
+        _parallel_semaphore_loop = loop
+    return _parallel_semaphore
+
+async def execute_parallel(*statements: Any) -> List[Result]:
+    """
+    Run independent read-only statements concurrently, each on its own pooled connection
+    
+    Statements on one AsyncSession run one after another; this keeps the wall time
+    close to the slowest query instead of their sum. At most PARALLEL_QUERY_LIMIT
+    statements run at once across all callers. Results are fully buffered, so
+    they stay usable after the connections go back to the pool.
+    
+    Args:
+        statements: Core selects (ORM entities are not loaded, select columns instead)
+        
+    Returns:
+        One result per statement, in the same order
+    """
+    semaphore = _get_parallel_semaphore()
+    
+    async def run(statement: Any) -> Result:
+        async with semaphore:
+            async with async_engine.connect() as conn:
+                return await conn.execute(statement)
+    
+    return list(await asyncio.gather(*(run(statement) for statement in statements)))
+
 # Base class for all models
 Base = declarative_base()
 
@@ -2,7 +2,7 @@ from datetime import datetime
 import hashlib
 import uuid
 from typing import Optional, Dict, Any, List
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, JSON, ForeignKey, Text
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, JSON, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 
 from app.models.database import Base
@@ -71,6 +71,15 @@ class Device(Base):
     firmware_updates = relationship("FirmwareUpdate", back_populates="device", cascade="all, delete-orphan")
     current_firmware = relationship("Firmware", foreign_keys=[current_firmware_id])
     
+    __table_args__ = (
+        # Partial indexes holding only the devices that support each protocol, so the
+        # per-protocol counts in the traffic stats run as small index-only scans
+        Index("ix_devices_supports_http", supports_http, postgresql_where=supports_http),
+        Index("ix_devices_supports_mqtt", supports_mqtt, postgresql_where=supports_mqtt),
+        Index("ix_devices_supports_coap", supports_coap, postgresql_where=supports_coap),
+        Index("ix_devices_supports_websocket", supports_websocket, postgresql_where=supports_websocket),
+    )
+    
     def __repr__(self):
         return f"<Device {self.name} ({self.ip_address})>"
     
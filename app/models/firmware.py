@@ -2,7 +2,7 @@
 from datetime import datetime
 import uuid
 from typing import Dict, Any
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 
 from app.models.database import Base
@@ -26,6 +26,16 @@ class Firmware(Base):
     # Relationships
     devices = relationship("Device", back_populates="current_firmware")
     
+    __table_args__ = (
+        # Serves "latest firmware per device type" (DISTINCT ON) lookups as index-only scans
+        Index(
+            "ix_firmware_type_release",
+            device_type,
+            release_date.desc(),
+            postgresql_include=["version", "is_critical", "id"]
+        ),
+    )
+    
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary"""
         return {
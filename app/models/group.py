@@ -36,6 +36,9 @@ class Group(Base):
     # Whether the group is active
     is_active = Column(Boolean, default=True)
     
+    # Number of devices in the group, kept in sync by a trigger on device_groups
+    device_count = Column(Integer, nullable=False, default=0, server_default="0")
+    
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -46,8 +49,14 @@ class Group(Base):
     def __repr__(self):
         return f"<Group {self.name} ({self.group_type})>"
     
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert group to dictionary for API responses"""
+    def to_dict(self, device_count: Optional[int] = None) -> Dict[str, Any]:
+        """Convert group to dictionary for API responses
+        
+        Pass device_count when it is fresher than the loaded device_count column
+        (e.g. right after a membership change).
+        """
+        if device_count is None:
+            device_count = self.device_count or 0
         return {
             "id": self.id,
             "name": self.name,
@@ -59,7 +68,7 @@ class Group(Base):
             "is_active": self.is_active,
             "created_at": self.created_at.isoformat(),
             "updated_at": self.updated_at.isoformat(),
-            "device_count": len(self.devices) if self.devices else 0
+            "device_count": device_count
         }
         
     def to_dict_with_devices(self) -> Dict[str, Any]:
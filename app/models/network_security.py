@@ -0,0 +1,16 @@
+from sqlalchemy import Integer, DateTime, table, column
+
+# Single-row materialized view with fleet-wide device and vulnerability counts
+# (see migration 4e8a1c7d3b52). Declared as a lightweight table so it stays out of
+# Base.metadata and autogenerate.
+network_security_summary = table(
+    'network_security_summary',
+    column('id', Integer),
+    column('device_count', Integer),
+    column('total_vulnerabilities', Integer),
+    column('critical', Integer),
+    column('high', Integer),
+    column('medium', Integer),
+    column('low', Integer),
+    column('refreshed_at', DateTime),
+)
@@ -1,7 +1,7 @@
 from datetime import datetime
 import logging
 from typing import Optional, Dict, Any, List
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, JSON, ForeignKey, Text, func
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, JSON, ForeignKey, Text, Index, func
 from sqlalchemy.orm import relationship
 
 from app.models.database import Base
@@ -49,6 +49,14 @@ class Notification(Base):
     recipients_details = relationship("NotificationRecipient", back_populates="notification",
                                       cascade="all, delete-orphan")
     
+    __table_args__ = (
+        # Composite indexes so the unread, type and source listings (all newest
+        # first) are index range scans rather than a scan plus sort
+        Index("ix_notif_unread_created", is_read, created_at.desc()),
+        Index("ix_notif_type_created", notification_type, created_at.desc()),
+        Index("ix_notif_source_created_at", source, source_id, created_at.desc()),
+    )
+    
     def __init__(self, **kwargs):
         # Initialize JSON fields as empty lists/dicts if not provided
         if 'recipients' not in kwargs:
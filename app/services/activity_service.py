@@ -1,8 +1,8 @@
 """Activity tracking service for the IoT Platform"""
 import logging
-from typing import Dict, List, Optional, Any, Union
+from typing import Dict, List, Optional, Any, Union, Tuple
 from datetime import datetime, timedelta, timezone
-from sqlalchemy import select, and_, or_, func, case
+from sqlalchemy import select, and_, or_, func, case, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql import desc
 from sqlalchemy.orm import aliased
@@ -258,16 +258,36 @@ class ActivityService:
         result = await self.db.execute(query)
         return result.scalars().all()
     
-    async def get_activities_by_target(self, target_type: str, target_id: int, limit: int = 100, skip: int = 0) -> List[Activity]:
-        """Get activities for a specific target"""
-        query = select(Activity).where(
+    async def get_activities_by_target(self, target_type: str, target_id: str, limit: int = 100, skip: int = 0,
+                                       before: Optional[Tuple[datetime, int]] = None) -> List[Activity]:
+        """
+        Get activities for a specific target
+        
+        Pass before as the (timestamp, id) of the last activity already seen for
+        keyset pagination over the (timestamp, id) ordering.
+        """
+        conditions = [
+            Activity.target_type == target_type,
+            Activity.target_id == target_id
+        ]
+        if before is not None:
+            conditions.append(tuple_(Activity.timestamp, Activity.id) < tuple_(*before))
+        query = select(Activity).where(and_(*conditions)).order_by(
+            desc(Activity.timestamp), desc(Activity.id)
+        ).offset(skip).limit(limit)
+        result = await self.db.execute(query)
+        return result.scalars().all()
+    
+    async def count_activities_by_target(self, target_type: str, target_id: str) -> int:
+        """Count activities for a specific target"""
+        query = select(func.count(Activity.id)).where(
             and_(
                 Activity.target_type == target_type,
                 Activity.target_id == target_id
             )
-        ).order_by(desc(Activity.timestamp)).offset(skip).limit(limit)
+        )
         result = await self.db.execute(query)
-        return result.scalars().all()
+        return result.scalar() or 0
     
     async def get_activities_by_time_range(self, start_time: datetime, end_time: datetime, limit: int = 100, skip: int = 0) -> List[Activity]:
         """Get activities within a time range"""
@@ -2,14 +2,21 @@
 import logging
 import jwt
 import re
+import time
+import copy
+import uuid
+from types import MappingProxyType
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, Tuple, List
+from typing import Optional, Dict, Any, Tuple, List, Mapping, Set
 from passlib.context import CryptContext
-from sqlalchemy import select, update
+from sqlalchemy import select, update, inspect
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 
 from app.models.client import Client
 from app.api.schemas import TokenData
+from app.utils.cache import TTLCache
+from app.utils.shared_cache import shared_cache
 from config.settings import settings
 
 logger = logging.getLogger(__name__)
@@ -17,6 +24,49 @@ logger = logging.getLogger(__name__)
 # Password hashing configuration
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Authenticated clients keyed by access token, so repeated requests with the same
+# token skip the client lookup (and its selectin relationship loads). Entries are
+# (generation, snapshot) pairs: read-only column snapshots rather than ORM
+# instances, since those belong to the session of the request that loaded them.
+# Entries never outlive the token. The cache is per process, so account changes
+# also bump the client's generation in shared_cache, and a hit whose generation no
+# longer matches is treated as a miss by every worker.
+CLIENT_CACHE_TTL = 60.0
+CLIENT_GENERATION_PREFIX = "client:gen:"
+_client_cache = TTLCache(ttl=CLIENT_CACHE_TTL, maxsize=10_000)
+# Tokens cached per client id, so invalidation doesn't scan the whole cache
+_client_tokens: Dict[str, Set[str]] = {}
+
+def _client_snapshot(client: Client) -> Mapping[str, Any]:
+    """Copy a client's column values into an immutable mapping"""
+    return MappingProxyType({
+        attr.key: copy.deepcopy(getattr(client, attr.key))
+        for attr in inspect(Client).column_attrs
+    })
+
+async def _client_generation(client_id: str) -> Optional[bytes]:
+    """Current cache generation of a client, shared by all workers"""
+    return await shared_cache.get(f"{CLIENT_GENERATION_PREFIX}{client_id}")
+
+def _remember_client(token: str, client_id: str, generation: Optional[bytes],
+                     snapshot: Mapping[str, Any], ttl: float) -> None:
+    """Cache a token lookup and index it under its client"""
+    _client_cache.set(token, (generation, snapshot), ttl=ttl)
+    # Forget tokens whose entries have already expired or been evicted
+    tokens = {cached for cached in _client_tokens.get(client_id, ()) if _client_cache.get(cached) is not None}
+    tokens.add(token)
+    _client_tokens[client_id] = tokens
+
+async def forget_cached_client(client_id: str) -> None:
+    """Invalidate cached token lookups for a client in every worker"""
+    for token in _client_tokens.pop(client_id, ()):
+        _client_cache.pop(token)
+    # Entries cached before this point expire within CLIENT_CACHE_TTL, so the new
+    # generation only has to outlive them
+    await shared_cache.set(
+        f"{CLIENT_GENERATION_PREFIX}{client_id}", uuid.uuid4().hex.encode(), ttl=CLIENT_CACHE_TTL
+    )
+
 class AuthService:
     """Service for authentication operations"""
     
@@ -218,6 +268,7 @@ class AuthService:
         )
         await self.db.execute(query)
         await self.db.commit()
+        await forget_cached_client(client_id)
         
         return True
         
@@ -383,6 +434,15 @@ class AuthService:
             
             if client_id is None:
                 return None
+            
+            # Read before any lookup, so a change committed meanwhile invalidates the entry
+            generation = await _client_generation(client_id)
+            cached = _client_cache.get(token)
+            if cached is not None and cached[0] == generation:
+                # Attach a fresh instance to this request's session without a query
+                client = Client(**copy.deepcopy(dict(cached[1])))
+                make_transient_to_detached(client)
+                return await self.db.merge(client, load=False)
                 
             token_data = TokenData(client_id=client_id)
             
@@ -396,6 +456,12 @@ class AuthService:
                 
             if not client.is_active:
                 return None
+            
+            ttl = CLIENT_CACHE_TTL
+            if payload.get("exp") is not None:
+                ttl = min(ttl, payload["exp"] - time.time())
+            if ttl > 0:
+                _remember_client(token, client_id, generation, _client_snapshot(client), ttl)
                 
             return client
             
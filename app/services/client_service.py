@@ -11,6 +11,7 @@ from sqlalchemy.orm import selectinload
 
 from app.models.client import Client
 from app.services.activity_service import ActivityService
+from app.services.auth_service import forget_cached_client
 
 logger = logging.getLogger(__name__)
 
@@ -179,6 +180,7 @@ class ClientService:
         # Save changes
         await self.db.commit()
         await self.db.refresh(client)
+        await forget_cached_client(client_id)
         
         # Log activity
         await self.activity_service.log_activity(
@@ -221,6 +223,7 @@ class ClientService:
         # Delete client
         await self.db.delete(client)
         await self.db.commit()
+        await forget_cached_client(client_id)
         
         # Log activity
         await self.activity_service.log_activity(
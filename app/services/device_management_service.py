@@ -13,7 +13,7 @@ from typing import Dict, List, Optional, Any, Tuple, Union
 from datetime import datetime
 from sqlalchemy import select, update, delete, and_, or_
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import selectinload, raiseload
 
 from app.models.device import Device
 from app.models.scan import Scan
@@ -1988,7 +1988,7 @@ class DeviceService:
         
         return device
         
-    async def get_device_status(self, device_id: str) -> Dict[str, Any]:
+    async def get_device_status(self, device_id: str) -> Optional[Dict[str, Any]]:
         """
         Get the current status of a device
         
@@ -1996,18 +1996,18 @@ class DeviceService:
             device_id: ID of the device
             
         Returns:
-            Dict with device status details
+            Dict with device status details, or None if the device does not exist
         """
         from sqlalchemy import select
         from app.models.device import Device
         
-        # Simple query without loading relationships
-        query = select(Device).where(Device.hash_id == device_id)
+        # Simple query; relationships must never be loaded on this hot path
+        query = select(Device).where(Device.hash_id == device_id).options(raiseload("*"))
         result = await self.db.execute(query)
         device = result.scalars().first()
         
         if not device:
-            return {"success": False, "error": "Device not found"}
+            return None
         
         # Get device metadata for state info
         metadata = device.device_metadata or {}
@@ -2028,6 +2028,7 @@ class DeviceService:
             "is_online": device.is_online,
             "status": status,  # Required field
             "last_seen": device.last_seen.isoformat() if device.last_seen else None,
+            "last_updated": device.updated_at,
             "firmware_version": device.firmware_version,
             "metadata": {
                 "ip_address": device.ip_address,
@@ -2088,6 +2089,7 @@ class DeviceService:
                     )
                     .order_by(desc(SensorReading.timestamp))
                     .limit(1)
+                    .options(raiseload("*"))
                 )
                 result = await self.db.execute(query)
                 reading = result.scalar_one_or_none()
@@ -3,16 +3,48 @@ import logging
 import asyncio
 import uuid
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, NamedTuple
 from sqlalchemy import select, update, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.models.database import AsyncSessionLocal
 from app.models.device import Device
 from app.models.firmware import Firmware, FirmwareUpdate
 from app.core.logging import logger
 from app.services.job_service import job_service, JobStatus
 from app.utils.notification_helper import NotificationHelper
-from app.utils.vulnerability_utils import VulnerabilityManager
+from app.utils.vulnerability_utils import vulnerability_manager
+from app.utils.cache import TTLCache
+
+class LatestFirmware(NamedTuple):
+    """Columns of a device type's newest firmware used for status checks"""
+    id: str
+    version: str
+    is_critical: bool
+    release_date: datetime
+    device_type: str
+
+# Latest firmware per device type changes only when firmware is created, so
+# lookups are shared across requests for a short period. Entries are plain
+# LatestFirmware rows, never ORM objects tied to the session that loaded them.
+# Types without any firmware are cached as None.
+_latest_firmware_cache = TTLCache(ttl=60.0, maxsize=128)
+_NOT_CACHED = object()
+
+def latest_firmware_query(device_types: Optional[List[str]] = None):
+    """Select the most recently released firmware row per device type
+    
+    DISTINCT ON keeps the first row of each device_type group, which the
+    release_date DESC ordering makes the newest release.
+    """
+    query = (
+        select(Firmware)
+        .order_by(Firmware.device_type, Firmware.release_date.desc())
+        .distinct(Firmware.device_type)
+    )
+    if device_types is not None:
+        query = query.where(Firmware.device_type.in_(device_types))
+    return query
 
 class FirmwareService:
     """Simplified service for managing device firmware updates"""
@@ -20,9 +52,12 @@ class FirmwareService:
     def __init__(self, db: AsyncSession):
         self.db = db
     
-    async def get_all_firmware(self, skip: int = 0, limit: int = 100) -> List[Firmware]:
-        """Get all firmware versions with pagination"""
-        query = select(Firmware).offset(skip).limit(limit)
+    async def get_all_firmware(self, skip: int = 0, limit: int = 100, device_type: Optional[str] = None) -> List[Firmware]:
+        """Get all firmware versions with pagination, optionally for a single device type"""
+        query = select(Firmware)
+        if device_type:
+            query = query.where(Firmware.device_type == device_type)
+        query = query.offset(skip).limit(limit)
         result = await self.db.execute(query)
         return result.scalars().all()
     
@@ -40,13 +75,51 @@ class FirmwareService:
         result = await self.db.execute(query)
         return result.scalars().first()
     
-    async def create_firmware(self, 
-                             version: str,
-                             name: str,
-                             device_type: str,
-                             is_critical: bool = False) -> Firmware:
-        """Create a new firmware entry"""
-        firmware = Firmware(
+    async def get_latest_firmware_for_device_types(self, device_types: List[str]) -> Dict[str, LatestFirmware]:
+        """Get the most recently released firmware for each of the given device types
+        
+        Args:
+            device_types: Device types to look up
+            
+        Returns:
+            Mapping of device type to its latest firmware; types without firmware are omitted.
+            Only the columns used for status checks are loaded, as read-only
+            LatestFirmware rows. Results are cached per device type for a minute
+            and invalidated when firmware is created.
+        """
+        latest = {}
+        missing = []
+        for device_type in device_types:
+            firmware = _latest_firmware_cache.get(device_type, _NOT_CACHED)
+            if firmware is _NOT_CACHED:
+                missing.append(device_type)
+            elif firmware is not None:
+                latest[device_type] = firmware
+        
+        if missing:
+            query = latest_firmware_query(missing).with_only_columns(
+                Firmware.id, Firmware.version, Firmware.is_critical, Firmware.release_date, Firmware.device_type
+            )
+            result = await self.db.execute(query)
+            fetched = {row.device_type: LatestFirmware(*row) for row in result}
+            for device_type in missing:
+                _latest_firmware_cache.set(device_type, fetched.get(device_type))
+            latest.update(fetched)
+        
+        return latest
+    
+    async def get_latest_firmware_for_device_type(self, device_type: str) -> Optional[LatestFirmware]:
+        """Get the most recently released firmware for a device type"""
+        latest = await self.get_latest_firmware_for_device_types([device_type])
+        return latest.get(device_type)
+    
+    @staticmethod
+    def build_firmware(version: str,
+                       name: str,
+                       device_type: str,
+                       is_critical: bool = False) -> Firmware:
+        """Build a new, unsaved firmware entry"""
+        return Firmware(
             id=str(uuid.uuid4()),
             version=version,
             name=name,
@@ -54,10 +127,25 @@ class FirmwareService:
             release_date=datetime.utcnow(),
             is_critical=is_critical
         )
-        
-        self.db.add(firmware)
+    
+    async def persist(self, *firmware: Firmware) -> List[Firmware]:
+        """Save firmware entries in a single transaction"""
+        self.db.add_all(firmware)
         await self.db.commit()
-        await self.db.refresh(firmware)
+        for fw in firmware:
+            await self.db.refresh(fw)
+            _latest_firmware_cache.pop(fw.device_type)
+        
+        return list(firmware)
+    
+    async def create_firmware(self, 
+                             version: str,
+                             name: str,
+                             device_type: str,
+                             is_critical: bool = False) -> Firmware:
+        """Create a new firmware entry"""
+        firmware = self.build_firmware(version, name, device_type, is_critical)
+        await self.persist(firmware)
         
         return firmware
     
@@ -71,24 +159,27 @@ class FirmwareService:
             
         Returns:
             The ID of the created firmware update job
+            
+        Raises:
+            LookupError: If the device does not exist
+            ValueError: If the device already runs the target version
         """
-        # Verify device exists
-        device_query = select(Device).where(Device.hash_id == device_id)
-        device_result = await self.db.execute(device_query)
-        device = device_result.scalars().first()
+        # Fetch the device and its target firmware (if any) in one round trip
+        query = (
+            select(Device, Firmware)
+            .outerjoin(Firmware, and_(
+                Firmware.device_type == Device.device_type,
+                Firmware.version == target_version
+            ))
+            .where(Device.hash_id == device_id)
+            .limit(1)
+        )
+        row = (await self.db.execute(query)).first()
         
-        if not device:
-            raise ValueError(f"Device with ID {device_id} not found")
+        if not row:
+            raise LookupError(f"Device with ID {device_id} not found")
         
-        # Find target firmware
-        firmware_query = select(Firmware).where(
-            and_(
-                Firmware.version == target_version,
-                Firmware.device_type == device.device_type
-            )
-        )
-        firmware_result = await self.db.execute(firmware_query)
-        firmware = firmware_result.scalars().first()
+        device, firmware = row
         
         if not firmware:
             # Auto-create firmware entry on-the-fly to satisfy demo flows
@@ -230,12 +321,11 @@ class FirmwareService:
             
             await self.db.commit()
             
-            # Remove firmware-fixable vulnerabilities from state
-            vm = VulnerabilityManager()
-            vulns = vm.get_device_vulnerabilities(device_id)
+            # Remove firmware-fixable vulnerabilities from the shared state
+            # (_update_device_vulnerabilities persists it)
+            vulns = vulnerability_manager.get_device_vulnerabilities(device_id)
             remaining = [v for v in vulns if v.get("fix_available") != "firmware_update"]
-            vm._update_device_vulnerabilities(device_id, remaining)
-            vm.save_state()
+            vulnerability_manager._update_device_vulnerabilities(device_id, remaining)
             
             # Mark job as completed
             await job_service.update_job_progress(job_id, 100, "Completed")
@@ -261,3 +351,71 @@ class FirmwareService:
             
             # Mark job as failed
             await job_service.update_job_status(job_id, JobStatus.FAILED)
+
+
+class LatestFirmwareBatcher:
+    """Coalesce concurrent latest-firmware lookups into batched queries
+    
+    Callers asking for the same device type share one pending future, and all
+    device types requested within ``max_wait_ms`` (or until ``max_batch`` types
+    are pending) are resolved with a single DISTINCT ON query on its own session.
+    Callers receive LatestFirmware rows, so nothing from that session escapes it.
+    """
+    
+    def __init__(self, max_wait_ms: int = 5, max_batch: int = 64):
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch = max_batch
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._timer: Optional[asyncio.Task] = None
+        self._tasks = set()
+    
+    async def get(self, device_type: str) -> Optional[LatestFirmware]:
+        """Get the latest firmware for a device type, batching with concurrent callers"""
+        firmware = _latest_firmware_cache.get(device_type, _NOT_CACHED)
+        if firmware is not _NOT_CACHED:
+            return firmware
+        
+        future = self._pending.get(device_type)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[device_type] = future
+            if len(self._pending) >= self.max_batch:
+                self._spawn(self._flush())
+            elif self._timer is None:
+                self._timer = self._spawn(self._flush_later())
+        
+        # Shield so one cancelled caller doesn't cancel the lookup for the others
+        return await asyncio.shield(future)
+    
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+    
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.max_wait)
+        self._timer = None
+        await self._flush()
+    
+    async def _flush(self) -> None:
+        batch, self._pending = self._pending, {}
+        if not batch:
+            return
+        
+        try:
+            async with AsyncSessionLocal() as session:
+                latest = await FirmwareService(session).get_latest_firmware_for_device_types(list(batch))
+        except Exception as e:
+            logger.error("Error fetching latest firmware batch: %s", e)
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for device_type, future in batch.items():
+            if not future.done():
+                future.set_result(latest.get(device_type))
+
+
+latest_firmware_batcher = LatestFirmwareBatcher()
@@ -11,18 +11,60 @@ The service handles all group-related operations including:
 - Group vulnerability statistics and reporting
 """
 import logging
-from typing import Dict, List, Optional, Any
+import uuid
+from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime
-from sqlalchemy import select, update, delete, or_, and_
+from sqlalchemy import select, update, delete, or_, and_, func, literal
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 
+from app.models.database import AsyncSessionLocal
 from app.models.group import Group, device_groups
 from app.models.device import Device
+from app.models.scan import Scan
 from app.services.security_service import VulnerabilityScanner
+from app.utils.cache import TTLCache
+from app.utils.shared_cache import shared_cache
 
 logger = logging.getLogger(__name__)
 
+# Cached dashboard responses are stored under this prefix, one key per limit
+DASHBOARD_CACHE_PREFIX = "group_security:dashboard:"
+# Cached group lookups (by device, by type); dropped on any group or membership change
+GROUPS_CACHE_PREFIX = "groups:"
+# Per-process snapshot of the default (first page, untyped) group listing, keyed by (skip, limit)
+_group_list_cache = TTLCache(ttl=5.0, maxsize=128)
+GROUP_LIST_CACHE_MAX_LIMIT = 100
+
+async def invalidate_cached_groups() -> None:
+    """Drop cached group lookups after a group or its membership changed
+    
+    Deleting a device also changes membership, through the device_groups cascade.
+    """
+    _group_list_cache.clear()
+    await shared_cache.delete_prefix(GROUPS_CACHE_PREFIX)
+
+def _placeholder_vulnerability_counts(device_count: int) -> Dict[str, int]:
+    """Mock per-severity vulnerability counts for a group of the given size"""
+    # Here we would normally query the database for actual vulnerability data
+    return {
+        "critical": device_count // 10,
+        "high": device_count // 5,
+        "medium": device_count // 3,
+        "low": device_count // 2
+    }
+
+def _group_risk_score(vulnerability_counts: Dict[str, int], device_count: int) -> float:
+    """Severity-weighted vulnerabilities per device, capped at 10"""
+    risk_score = (
+        (vulnerability_counts["critical"] * 10.0) +
+        (vulnerability_counts["high"] * 7.5) +
+        (vulnerability_counts["medium"] * 5.0) +
+        (vulnerability_counts["low"] * 2.5)
+    ) / max(1, device_count)
+    return min(10.0, risk_score)
+
 class GroupService:
     """Service for managing device groups"""
     
@@ -35,16 +77,71 @@ class GroupService:
         result = await self.db.execute(query)
         return result.scalars().all()
     
-    async def get_group_by_id(self, group_id: int) -> Optional[Group]:
-        """Get a group by ID"""
+    @staticmethod
+    def lite_groups_query(skip: int = 0, limit: int = 100, group_type: Optional[str] = None):
+        """Build the plain-column group listing query used by get_all_groups_lite"""
+        query = (
+            select(
+                Group.id, Group.name, Group.description, Group.group_type,
+                Group.attributes, Group.icon, Group.color, Group.is_active,
+                Group.created_at, Group.updated_at, Group.device_count
+            )
+            .order_by(Group.id)
+            .offset(skip)
+            .limit(limit)
+        )
+        if group_type:
+            query = query.where(Group.group_type == group_type)
+        return query
+    
+    @staticmethod
+    def lite_group_dict(row) -> Dict[str, Any]:
+        """Shape a lite_groups_query row like Group.to_dict()"""
+        return {
+            "id": row.id,
+            "name": row.name,
+            "description": row.description,
+            "group_type": row.group_type,
+            "attributes": row.attributes,
+            "icon": row.icon,
+            "color": row.color,
+            "is_active": row.is_active,
+            "created_at": row.created_at.isoformat(),
+            "updated_at": row.updated_at.isoformat(),
+            "device_count": row.device_count
+        }
+    
+    async def get_all_groups_lite(self, skip: int = 0, limit: int = 100, group_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """List groups as response dicts with device counts, in a single query
+        
+        Selects plain columns instead of ORM objects, so no Group instances are
+        built and no relationship is touched. The first page of the untyped
+        listing is served from a short-lived in-process snapshot.
+        """
+        cacheable = group_type is None and skip == 0 and limit <= GROUP_LIST_CACHE_MAX_LIMIT
+        if cacheable:
+            groups = _group_list_cache.get((skip, limit))
+            if groups is not None:
+                return groups
+        
+        result = await self.db.execute(self.lite_groups_query(skip, limit, group_type))
+        groups = [self.lite_group_dict(row) for row in result]
+        if cacheable:
+            _group_list_cache.set((skip, limit), groups)
+        return groups
+    
+    async def get_group_by_id(self, group_id: int, with_devices: bool = True) -> Optional[Group]:
+        """Get a group by ID, by default with its devices eager-loaded in the same query"""
+        if not with_devices:
+            return await self.db.get(Group, group_id)
         query = select(Group).where(Group.id == group_id).options(joinedload(Group.devices))
         result = await self.db.execute(query)
         # Deduplicate joined eager-loaded rows before retrieving single result
         return result.unique().scalar_one_or_none()
     
-    async def get_groups_by_type(self, group_type: str) -> List[Group]:
-        """Get groups by type"""
-        query = select(Group).where(Group.group_type == group_type)
+    async def get_groups_by_type(self, group_type: str, skip: int = 0, limit: int = 100) -> List[Group]:
+        """Get groups by type with pagination"""
+        query = select(Group).where(Group.group_type == group_type).offset(skip).limit(limit)
         result = await self.db.execute(query)
         return result.scalars().all()
     
@@ -74,6 +171,7 @@ class GroupService:
         
         await self.db.commit()
         await self.db.refresh(group)
+        await invalidate_cached_groups()
         return group
     
     async def update_group(self, 
@@ -85,7 +183,7 @@ class GroupService:
                           attributes: Optional[Dict[str, Any]] = None,
                           is_active: Optional[bool] = None) -> Optional[Group]:
         """Update a group"""
-        group = await self.get_group_by_id(group_id)
+        group = await self.get_group_by_id(group_id, with_devices=False)
         if not group:
             return None
         
@@ -105,6 +203,7 @@ class GroupService:
         
         await self.db.commit()
         await self.db.refresh(group)
+        await invalidate_cached_groups()
         return group
     
     async def delete_group(self, group_id: int) -> bool:
@@ -115,45 +214,75 @@ class GroupService:
         
         await self.db.delete(group)
         await self.db.commit()
+        await invalidate_cached_groups()
         return True
     
-    async def add_devices_to_group(self, group_id: int, device_ids: List[str]) -> bool:
-        """Add devices to a group"""
-        group = await self.get_group_by_id(group_id)
-        if not group:
-            return False
+    async def add_devices_to_group(self, group_id: int, device_ids: List[str]) -> Optional[Tuple[Group, int]]:
+        """Add devices to a group
         
-        # Get devices by hash_id
-        query = select(Device).where(Device.hash_id.in_(device_ids))
-        result = await self.db.execute(query)
-        devices = result.scalars().all()
+        Membership rows are inserted with ON CONFLICT DO NOTHING and the new
+        device count is computed in the same statement.
+        
+        Returns:
+            The group and its updated device count, or None if the group doesn't exist
+        """
+        group = await self.db.get(Group, group_id)
+        if not group:
+            return None
         
-        # Add devices to group
-        for device in devices:
-            if device not in group.devices:
-                group.devices.append(device)
+        # Only link devices that exist; unknown hash IDs are ignored
+        added = (
+            pg_insert(device_groups)
+            .from_select(
+                ["device_id", "group_id"],
+                select(Device.hash_id, literal(group_id)).where(Device.hash_id.in_(device_ids))
+            )
+            .on_conflict_do_nothing()
+            .returning(device_groups.c.device_id)
+            .cte("added")
+        )
+        # Subqueries see the snapshot from before the insert, so add the inserted rows
+        device_count = await self.db.scalar(
+            select(self._member_count(group_id) + select(func.count()).select_from(added).scalar_subquery())
+        )
         
         await self.db.commit()
-        return True
+        await invalidate_cached_groups()
+        return group, device_count
     
-    async def remove_devices_from_group(self, group_id: int, device_ids: List[str]) -> bool:
-        """Remove devices from a group"""
-        group = await self.get_group_by_id(group_id)
-        if not group:
-            return False
+    async def remove_devices_from_group(self, group_id: int, device_ids: List[str]) -> Optional[Tuple[Group, int]]:
+        """Remove devices from a group
         
-        # Get devices by hash_id
-        query = select(Device).where(Device.hash_id.in_(device_ids))
-        result = await self.db.execute(query)
-        devices = result.scalars().all()
+        Returns:
+            The group and its updated device count, or None if the group doesn't exist
+        """
+        group = await self.db.get(Group, group_id)
+        if not group:
+            return None
         
-        # Remove devices from group
-        for device in devices:
-            if device in group.devices:
-                group.devices.remove(device)
+        removed = (
+            delete(device_groups)
+            .where(device_groups.c.group_id == group_id, device_groups.c.device_id.in_(device_ids))
+            .returning(device_groups.c.device_id)
+            .cte("removed")
+        )
+        device_count = await self.db.scalar(
+            select(self._member_count(group_id) - select(func.count()).select_from(removed).scalar_subquery())
+        )
         
         await self.db.commit()
-        return True
+        await invalidate_cached_groups()
+        return group, device_count
+    
+    @staticmethod
+    def _member_count(group_id: int):
+        """Scalar subquery counting the devices currently linked to a group"""
+        return (
+            select(func.count())
+            .select_from(device_groups)
+            .where(device_groups.c.group_id == group_id)
+            .scalar_subquery()
+        )
     
     async def get_devices_in_group(self, group_id: int) -> List[Device]:
         """Get all devices in a group"""
@@ -174,11 +303,9 @@ class GroupService:
             
         return device.groups
         
-    def format_group_response(self, group: Group) -> Dict[str, Any]:
+    def format_group_response(self, group: Group, device_count: Optional[int] = None) -> Dict[str, Any]:
         """Format a group for API response with device count"""
-        group_dict = group.to_dict()
-        group_dict["device_count"] = len(group.devices) if group.devices else 0
-        return group_dict
+        return group.to_dict(device_count=device_count)
     
     def format_groups_response(self, groups: List[Group]) -> List[Dict[str, Any]]:
         """Format a list of groups for API response with device counts"""
@@ -193,20 +320,21 @@ class GroupVulnerabilityService:
         self.vulnerability_scanner = VulnerabilityScanner(db)
         self.group_service = GroupService(db)
     
-    async def scan_group(self, group_id: int) -> Dict[str, Any]:
-        """Scan all devices in a group for vulnerabilities"""
-        # Verify group exists
-        group = await self.group_service.get_group_by_id(group_id)
+    async def reserve_scan_id(self, group_id: int) -> Dict[str, Any]:
+        """Record a pending scan for all devices in a group
+        
+        Only the scan row is written here; the scan itself is done by
+        run_scan, which is meant to run as a background task.
+        """
+        # Verify group exists; the device count comes from the denormalized column
+        group = await self.db.get(Group, group_id)
         if not group:
             return {
                 "status": "failed",
                 "message": f"Group with ID {group_id} not found"
             }
         
-        # Get all devices in the group
-        devices = await self.group_service.get_devices_in_group(group_id)
-        
-        if not devices:
+        if not group.device_count:
             return {
                 "status": "info",
                 "message": f"No devices found in group {group.name} (ID: {group_id})",
@@ -214,33 +342,77 @@ class GroupVulnerabilityService:
                 "group_name": group.name
             }
         
-        # Extract device hash_ids
-        device_ids = [device.hash_id for device in devices]
-        
-        # Start a vulnerability scan for these devices
-        scan_result = await self.vulnerability_scanner.scan_multiple_devices(device_ids)
+        scan = Scan(
+            id=str(uuid.uuid4()),
+            scan_type="group_vulnerability",
+            status="pending",
+            start_time=datetime.now(),
+            results={"group_id": group_id, "group_name": group.name}
+        )
+        self.db.add(scan)
+        await self.db.commit()
         
-        # Add group information to the result
-        scan_result["group_id"] = group_id
-        scan_result["group_name"] = group.name
-        scan_result["group_type"] = group.group_type
+        return {
+            "status": "started",
+            "scan_id": scan.id,
+            "group_id": group_id,
+            "group_name": group.name,
+            "group_type": group.group_type,
+            "device_count": group.device_count,
+            "start_time": scan.start_time.isoformat()
+        }
+    
+    @staticmethod
+    async def run_scan(scan_id: str) -> None:
+        """Scan the devices of a group for a scan reserved with reserve_scan_id
         
-        return scan_result
+        Runs after the response has been sent, so it uses its own session.
+        """
+        async with AsyncSessionLocal() as session:
+            scan = await session.get(Scan, scan_id)
+            if not scan:
+                logger.error("Scan with ID %s not found", scan_id)
+                return
+            group_info = dict(scan.results or {})
+            
+            try:
+                query = (
+                    select(Device)
+                    .join(device_groups, device_groups.c.device_id == Device.hash_id)
+                    .where(device_groups.c.group_id == group_info.get("group_id"))
+                )
+                devices = (await session.execute(query)).scalars().all()
+                
+                scan.status = "in_progress"
+                await session.commit()
+                
+                scan_result = await VulnerabilityScanner(session).bulk_scan(devices)
+                
+                scan.status = "completed"
+                scan.end_time = datetime.now()
+                scan.results = {**group_info, **scan_result}
+                await session.commit()
+                
+                logger.info("Group vulnerability scan %s completed with %s findings", scan_id, scan_result["total_vulnerabilities"])
+            except Exception as e:
+                logger.error("Error during group vulnerability scan %s: %s", scan_id, e, exc_info=True)
+                await session.rollback()
+                scan.status = "error"
+                scan.end_time = datetime.now()
+                scan.results = {**group_info, "error": str(e)}
+                await session.commit()
     
     async def get_group_vulnerability_stats(self, group_id: int) -> Dict[str, Any]:
         """Get vulnerability statistics for a group"""
-        # Verify group exists
-        group = await self.group_service.get_group_by_id(group_id)
+        # Verify group exists; the stats only need the denormalized device count
+        group = await self.db.get(Group, group_id)
         if not group:
             return {
                 "status": "failed",
                 "message": f"Group with ID {group_id} not found"
             }
         
-        # Get all devices in the group
-        devices = await self.group_service.get_devices_in_group(group_id)
-        
-        if not devices:
+        if not group.device_count:
             return {
                 "status": "info",
                 "message": f"No devices found in group {group.name} (ID: {group_id})",
@@ -250,33 +422,10 @@ class GroupVulnerabilityService:
                 "vulnerability_stats": {}
             }
         
-        # Calculate vulnerability statistics from each device's latest vulnerability scan
-        total_devices = len(devices)
-        devices_with_vulnerabilities = 0
-        vulnerability_counts = {
-            "critical": 0,
-            "high": 0,
-            "medium": 0,
-            "low": 0
-        }
-        
-        # Here we would normally query the database for actual vulnerability data
         # For now, we'll return mock statistics
+        total_devices = group.device_count
         devices_with_vulnerabilities = total_devices // 2
-        vulnerability_counts = {
-            "critical": total_devices // 10,
-            "high": total_devices // 5,
-            "medium": total_devices // 3,
-            "low": total_devices // 2
-        }
-        
-        # Calculate risk score based on vulnerabilities
-        risk_score = (
-            (vulnerability_counts["critical"] * 10.0) +
-            (vulnerability_counts["high"] * 7.5) +
-            (vulnerability_counts["medium"] * 5.0) +
-            (vulnerability_counts["low"] * 2.5)
-        ) / max(1, total_devices)
+        vulnerability_counts = _placeholder_vulnerability_counts(total_devices)
         
         return {
             "status": "success",
@@ -286,7 +435,7 @@ class GroupVulnerabilityService:
             "device_count": total_devices,
             "devices_with_vulnerabilities": devices_with_vulnerabilities,
             "vulnerability_counts": vulnerability_counts,
-            "risk_score": min(10.0, risk_score),
+            "risk_score": _group_risk_score(vulnerability_counts, total_devices),
             "last_scan_date": datetime.utcnow().isoformat()
         }
         
@@ -299,10 +448,11 @@ class GroupVulnerabilityService:
         Returns:
             Dashboard data with vulnerability statistics across groups
         """
-        # Get all groups
-        all_groups = await self.group_service.get_all_groups(limit=100)  # Reasonable upper limit
+        # Group sizes are denormalized, so one query covers every group
+        result = await self.db.execute(select(Group.id, Group.name, Group.device_count))
+        groups = result.all()
         
-        if not all_groups:
+        if not groups:
             return {
                 "status": "info",
                 "message": "No groups found in the system",
@@ -317,7 +467,6 @@ class GroupVulnerabilityService:
                 }
             }
         
-        # Get vulnerability stats for each group
         group_stats = []
         total_vulnerability_counts = {
             "critical": 0,
@@ -327,50 +476,46 @@ class GroupVulnerabilityService:
         }
         groups_with_vulnerabilities = 0
         
-        for group in all_groups:
-            # Get stats for this group
-            stats = await self.get_group_vulnerability_stats(group.id)
-            
-            # Skip groups with errors or no devices
-            if stats.get("status") != "success":
+        # Groups without devices have no statistics
+        for group_id, group_name, device_count in groups:
+            if not device_count:
                 continue
-                
-            # Get vulnerability counts and add to totals
-            counts = stats.get("vulnerability_counts", {})
-            has_vulnerabilities = False
             
+            counts = _placeholder_vulnerability_counts(device_count)
             for severity, count in counts.items():
-                if count > 0:
-                    has_vulnerabilities = True
-                    total_vulnerability_counts[severity] += count
-            
-            if has_vulnerabilities:
+                total_vulnerability_counts[severity] += count
+            if any(counts.values()):
                 groups_with_vulnerabilities += 1
-                
-            # Add to group stats if has vulnerabilities
+            
             group_stats.append({
-                "group_id": stats["group_id"],
-                "group_name": stats["group_name"],
-                "risk_score": stats.get("risk_score", 0),
+                "group_id": group_id,
+                "group_name": group_name,
+                "risk_score": _group_risk_score(counts, device_count),
                 "vulnerability_count": sum(counts.values()),
                 "vulnerability_counts": counts
             })
         
-        # Sort by risk score (descending)
-        group_stats.sort(key=lambda x: x["risk_score"], reverse=True)
-        
-        # Limit to requested number
-        highest_risk_groups = group_stats[:limit]
+        # Highest risk first
+        group_stats.sort(key=lambda stats: (-stats["risk_score"], stats["group_id"]))
         
         return {
             "status": "success",
             "groups_with_vulnerabilities": groups_with_vulnerabilities,
-            "total_groups": len(all_groups),
-            "highest_risk_groups": highest_risk_groups,
+            "total_groups": len(groups),
+            "highest_risk_groups": group_stats[:limit],
             "vulnerability_distribution": total_vulnerability_counts
         }
 
 
+async def refresh_vulnerability_dashboard() -> None:
+    """Drop cached dashboard responses
+    
+    Meant to run as a background task after group membership changes, so the
+    next dashboard request recomputes the statistics from the new group sizes.
+    """
+    await shared_cache.delete_prefix(DASHBOARD_CACHE_PREFIX)
+
+
 #-----------------------------------------------------------------
 # Factory functions to create service instances
 #-----------------------------------------------------------------
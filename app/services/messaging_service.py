@@ -18,13 +18,13 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any, Tuple, Union
-from sqlalchemy import select, desc, and_, or_, update, func
+from sqlalchemy import select, insert, desc, and_, or_, update, func, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from twilio.rest import Client
 from twilio.base.exceptions import TwilioRestException
 
-from app.models.notification import Notification
+from app.models.notification import Notification, NotificationRecipient
 from app.services.activity_service import ActivityService
 from app.services.websocket_service import publish_event
 from config import settings
@@ -161,60 +161,9 @@ class EmailService:
             part2 = MIMEText(body_html, 'html')
             msg.attach(part2)
             
-            # Connect to SMTP server with Gmail-specific handling
+            # smtplib blocks, so the SMTP session runs on a worker thread
             try:
-                # Gmail-specific connection handling
-                if self.is_gmail:
-                    if self.smtp_port == 587:
-                        # Use STARTTLS for port 587 (Gmail standard)
-                        logger.info(f"Using Gmail STARTTLS connection method on port 587")
-                        server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-                        server.ehlo()
-                        server.starttls()
-                        server.ehlo()
-                    elif self.smtp_port == 465:
-                        # Use direct SSL for port 465
-                        logger.info(f"Using Gmail direct SSL connection method on port 465")
-                        context = ssl.create_default_context()
-                        server = smtplib.SMTP_SSL(self.smtp_server, self.smtp_port, context=context)
-                    else:
-                        # Fall back to standard TLS for other ports
-                        logger.warning(f"Unusual port {self.smtp_port} for Gmail - attempting TLS connection")
-                        context = ssl.create_default_context()
-                        server = smtplib.SMTP_SSL(self.smtp_server, self.smtp_port, context=context)
-                else:
-                    # Non-Gmail connection handling
-                    if self.use_tls and self.smtp_port == 465:
-                        # Direct SSL connection
-                        logger.info(f"Using direct SSL connection to {self.smtp_server}:{self.smtp_port}")
-                        context = ssl.create_default_context()
-                        server = smtplib.SMTP_SSL(self.smtp_server, self.smtp_port, context=context)
-                    elif self.use_tls:
-                        # STARTTLS for TLS on other ports
-                        logger.info(f"Using STARTTLS connection to {self.smtp_server}:{self.smtp_port}")
-                        server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-                        server.ehlo()
-                        server.starttls()
-                        server.ehlo()
-                    else:
-                        # Plain connection
-                        logger.info(f"Using plain connection to {self.smtp_server}:{self.smtp_port}")
-                        server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-                        server.ehlo()
-                
-                # Login and send
-                if self.smtp_username and self.smtp_password:
-                    logger.info(f"Attempting login for {self.smtp_username}")
-                    server.login(self.smtp_username, self.smtp_password)
-                    logger.info(f"SMTP login successful for {self.smtp_username}")
-                
-                logger.info(f"Sending email to {to_email} with subject '{subject}'")
-                server.send_message(msg)
-                logger.info(f"Email sent successfully to {to_email}")
-                
-                # Close connection
-                server.quit()
-                
+                await asyncio.to_thread(self._deliver, msg, to_email, subject)
             except Exception as smtp_error:
                 logger.error(f"SMTP Error: {str(smtp_error)}", exc_info=True)
                 raise
@@ -258,6 +207,60 @@ class EmailService:
                 "in_retry_queue": retry_on_failure
             }
     
+    def _deliver(self, msg: MIMEMultipart, to_email: str, subject: str) -> None:
+        """Open an SMTP connection (Gmail-aware), send msg and close it; blocking"""
+        # Gmail-specific connection handling
+        if self.is_gmail:
+            if self.smtp_port == 587:
+                # Use STARTTLS for port 587 (Gmail standard)
+                logger.info(f"Using Gmail STARTTLS connection method on port 587")
+                server = smtplib.SMTP(self.smtp_server, self.smtp_port)
+                server.ehlo()
+                server.starttls()
+                server.ehlo()
+            elif self.smtp_port == 465:
+                # Use direct SSL for port 465
+                logger.info(f"Using Gmail direct SSL connection method on port 465")
+                context = ssl.create_default_context()
+                server = smtplib.SMTP_SSL(self.smtp_server, self.smtp_port, context=context)
+            else:
+                # Fall back to standard TLS for other ports
+                logger.warning(f"Unusual port {self.smtp_port} for Gmail - attempting TLS connection")
+                context = ssl.create_default_context()
+                server = smtplib.SMTP_SSL(self.smtp_server, self.smtp_port, context=context)
+        else:
+            # Non-Gmail connection handling
+            if self.use_tls and self.smtp_port == 465:
+                # Direct SSL connection
+                logger.info(f"Using direct SSL connection to {self.smtp_server}:{self.smtp_port}")
+                context = ssl.create_default_context()
+                server = smtplib.SMTP_SSL(self.smtp_server, self.smtp_port, context=context)
+            elif self.use_tls:
+                # STARTTLS for TLS on other ports
+                logger.info(f"Using STARTTLS connection to {self.smtp_server}:{self.smtp_port}")
+                server = smtplib.SMTP(self.smtp_server, self.smtp_port)
+                server.ehlo()
+                server.starttls()
+                server.ehlo()
+            else:
+                # Plain connection
+                logger.info(f"Using plain connection to {self.smtp_server}:{self.smtp_port}")
+                server = smtplib.SMTP(self.smtp_server, self.smtp_port)
+                server.ehlo()
+        
+        # Login and send
+        if self.smtp_username and self.smtp_password:
+            logger.info(f"Attempting login for {self.smtp_username}")
+            server.login(self.smtp_username, self.smtp_password)
+            logger.info(f"SMTP login successful for {self.smtp_username}")
+        
+        logger.info(f"Sending email to {to_email} with subject '{subject}'")
+        server.send_message(msg)
+        logger.info(f"Email sent successfully to {to_email}")
+        
+        # Close connection
+        server.quit()
+        
     def _validate_email(self, email: str) -> bool:
         """Validate email address format"""
         # Basic email validation
@@ -458,6 +461,9 @@ class SMSService:
         # Start background task for processing SMS queue
         self.is_processing_queue = False
         
+        # Twilio REST client, created on first send and reused afterwards
+        self._client: Optional[Client] = None
+        
     async def send_sms(self, 
                       to_number: str, 
                       message: str,
@@ -518,11 +524,14 @@ class SMSService:
                     "in_retry_queue": retry_on_failure
                 }
             
-            # Initialize Twilio client
-            client = Client(self.account_sid, self.auth_token)
+            # Reuse the Twilio client (and its HTTP connection pool) across sends
+            if self._client is None:
+                self._client = Client(self.account_sid, self.auth_token)
+            client = self._client
             
-            # Send SMS
-            message = client.messages.create(
+            # Send SMS; the Twilio REST client blocks, so it runs on a worker thread
+            message = await asyncio.to_thread(
+                client.messages.create,
                 body=message,
                 from_=self.from_number,
                 to=to_number
@@ -690,21 +699,48 @@ class SMSService:
 # ===== NOTIFICATION SERVICE =====
 #
 
+# Equality filters accepted by NotificationService.filter_notifications
+NOTIFICATION_FILTER_COLUMNS = {
+    "notification_type": Notification.notification_type,
+    "source": Notification.source,
+    "source_id": Notification.source_id,
+    "target_type": Notification.target_type,
+    "target_id": Notification.target_id,
+    "priority": Notification.priority,
+    "is_read": Notification.is_read,
+}
+
 class NotificationService:
     """Service for managing notifications with multi-channel delivery"""
     
     def __init__(self, db: AsyncSession):
         self.db = db
         self.activity_service = ActivityService(db)
-        self.email_service = EmailService()
-        self.sms_service = SMSService()
+        # Providers are process-wide so SMS rate limits and the Twilio client
+        # are shared across requests instead of rebuilt for every service
+        self.email_service = email_service
+        self.sms_service = sms_service
+    
+    @staticmethod
+    def all_notifications_query(limit: int = 100, offset: int = 0, before_id: Optional[int] = None):
+        """
+        Select notifications newest first, with pagination
+        
+        Passing the id of the last notification already seen as before_id pages by
+        keyset (created_at, id) instead of OFFSET, so deep pages cost the same as the first.
+        """
+        query = select(Notification).order_by(desc(Notification.created_at), desc(Notification.id))
+        if before_id is not None:
+            cursor = select(Notification.created_at, Notification.id).where(Notification.id == before_id)
+            query = query.where(tuple_(Notification.created_at, Notification.id) < cursor.scalar_subquery())
+        return query.limit(limit).offset(offset)
     
     async def get_all_notifications(self, 
                                    limit: int = 100, 
-                                   offset: int = 0) -> List[Notification]:
-        """Get all notifications with pagination"""
-        query = select(Notification).order_by(desc(Notification.created_at)).limit(limit).offset(offset)
-        result = await self.db.execute(query)
+                                   offset: int = 0,
+                                   before_id: Optional[int] = None) -> List[Notification]:
+        """Get all notifications with pagination (see all_notifications_query)"""
+        result = await self.db.execute(self.all_notifications_query(limit, offset, before_id))
         return result.scalars().all()
     
     async def get_notification_by_id(self, notification_id: int) -> Optional[Notification]:
@@ -717,6 +753,35 @@ class NotificationService:
         result = await self.db.execute(query)
         return result.scalars().all()
     
+    async def filter_notifications(self,
+                                   start_time: Optional[datetime] = None,
+                                   end_time: Optional[datetime] = None,
+                                   skip: int = 0,
+                                   limit: int = 100,
+                                   **equals: Any) -> List[Notification]:
+        """
+        Get notifications matching every given filter, newest first
+        
+        Args:
+            start_time: Only notifications created at or after this time
+            end_time: Only notifications created at or before this time
+            skip: Number of notifications to skip
+            limit: Maximum number of notifications to return
+            **equals: Equality filters named as in NOTIFICATION_FILTER_COLUMNS; None values are ignored
+        """
+        query = select(Notification).where(*(
+            NOTIFICATION_FILTER_COLUMNS[name] == value
+            for name, value in equals.items() if value is not None
+        ))
+        if start_time:
+            query = query.where(Notification.created_at >= start_time)
+        if end_time:
+            query = query.where(Notification.created_at <= end_time)
+        
+        query = query.order_by(desc(Notification.created_at)).limit(limit).offset(skip)
+        result = await self.db.execute(query)
+        return result.scalars().all()
+    
     async def get_notifications_by_priority(self, priority: int) -> List[Notification]:
         """Get notifications by priority level"""
         query = select(Notification).where(Notification.priority == priority).order_by(desc(Notification.created_at))
@@ -756,24 +821,25 @@ class NotificationService:
         Returns:
             Created notification object
         """
-        # Create notification object
-        notification = Notification(
-            title=title,
-            content=content,
-            notification_type=notification_type,
-            source=source,
-            source_id=source_id,
-            target_type=target_type,
-            target_id=target_id,
-            target_name=target_name,
-            priority=priority,
-            notification_metadata=json.dumps(metadata) if metadata else None
+        # INSERT ... RETURNING hands back the row with its generated id and
+        # timestamps in the same round trip, so no refresh is needed
+        notification = await self.db.scalar(
+            insert(Notification).values(
+                title=title,
+                content=content,
+                notification_type=notification_type,
+                source=source,
+                source_id=source_id,
+                target_type=target_type,
+                target_id=target_id,
+                target_name=target_name,
+                priority=priority,
+                recipients=recipients or [],
+                channels=channels or [],
+                notification_metadata=json.dumps(metadata) if metadata else None
+            ).returning(Notification)
         )
-        
-        # Add to database
-        self.db.add(notification)
         await self.db.commit()
-        await self.db.refresh(notification)
         
         # Record activity
         await self.activity_service.log_activity(
@@ -798,6 +864,70 @@ class NotificationService:
         
         return notification
     
+    async def create_notification_with_clients(self,
+                                               title: str,
+                                               content: str,
+                                               client_ids: List[str],
+                                               notification_type: str = "info",
+                                               source: str = "system",
+                                               source_id: Optional[int] = None,
+                                               target_type: Optional[str] = None,
+                                               target_id: Optional[str] = None,
+                                               target_name: Optional[str] = None,
+                                               priority: int = 3,
+                                               channels: List[str] = None,
+                                               metadata: Dict[str, Any] = None) -> Notification:
+        """
+        Create a notification together with its per-client recipient rows
+        
+        Args:
+            title: Notification title
+            content: Notification content/body
+            client_ids: IDs of the clients that receive the notification
+            notification_type: Type of notification (info, warning, alert, error)
+            source: Source of the notification (system, rule, user)
+            source_id: ID of the source (e.g., rule_id)
+            target_type: Type of target (device, group, system)
+            target_id: ID of the target
+            target_name: Name of the target
+            priority: Priority level (1-5, where 5 is highest)
+            channels: Delivery channels; one recipient row is created per client and channel
+            metadata: Additional metadata for the notification_metadata field
+        
+        Returns:
+            Created notification object
+        """
+        channels = channels or ["in_app"]
+        notification = await self.db.scalar(
+            insert(Notification).values(
+                title=title,
+                content=content,
+                notification_type=notification_type,
+                source=source,
+                source_id=source_id,
+                target_type=target_type,
+                target_id=str(target_id) if target_id is not None else None,
+                target_name=target_name,
+                priority=priority,
+                recipients=list(client_ids),
+                channels=channels,
+                notification_metadata=metadata or {}
+            ).returning(Notification)
+        )
+        
+        # Recipient rows go in as one batched INSERT, in the same transaction
+        if client_ids:
+            await self.db.execute(
+                insert(NotificationRecipient),
+                [
+                    {"notification_id": notification.id, "client_id": client_id, "delivery_channel": channel}
+                    for client_id in client_ids
+                    for channel in channels
+                ]
+            )
+        await self.db.commit()
+        return notification
+    
     async def mark_as_read(self, notification_id: int) -> bool:
         """Mark a notification as read"""
         notification = await self.get_notification_by_id(notification_id)
@@ -810,14 +940,25 @@ class NotificationService:
         return True
     
     async def mark_all_as_read(self) -> int:
-        """Mark all notifications as read"""
+        """Mark all notifications, and their per-recipient read state, as read"""
+        read_at = datetime.utcnow()
         query = update(Notification).where(Notification.is_read == False).values(
             is_read=True,
-            read_at=datetime.utcnow()
-        )
-        result = await self.db.execute(query)
+            read_at=read_at
+        ).returning(Notification.id)
+        notification_ids = (await self.db.execute(query)).scalars().all()
+        
+        if notification_ids:
+            await self.db.execute(
+                update(NotificationRecipient)
+                .where(
+                    NotificationRecipient.notification_id.in_(notification_ids),
+                    NotificationRecipient.is_read == False
+                )
+                .values(is_read=True, read_at=read_at)
+            )
         await self.db.commit()
-        return result.rowcount
+        return len(notification_ids)
     
     async def delete_notification(self, notification_id: int) -> bool:
         """Delete a notification"""
@@ -985,6 +1126,22 @@ class NotificationService:
         Returns:
             Result of the sending operation
         """
+        return await self.send_notification_multi(notification_id, [channel])
+    
+    async def send_notification_multi(self, notification_id: int, channels: List[str]) -> Dict[str, Any]:
+        """
+        Send a notification through several channels concurrently
+        
+        The notification is loaded once and each channel is dispatched at the same time,
+        so the total time is that of the slowest channel rather than the sum.
+        
+        Args:
+            notification_id: ID of the notification to send
+            channels: Channels to send through (email, sms, websocket, in_app)
+            
+        Returns:
+            Result of the sending operation, with the outcome for each channel
+        """
         # Get the notification
         notification = await self.get_notification_by_id(notification_id)
         if not notification:
@@ -1004,8 +1161,18 @@ class NotificationService:
         if not recipients:
             return {"success": False, "error": "No recipients found for notification"}
         
-        # Dispatch to the specified channel
-        results = await self._dispatch_notification(notification, recipients, [channel])
+        # Dispatch to every channel at once; a failing channel doesn't stop the others
+        channel_results = await asyncio.gather(
+            *(self._dispatch_notification(notification, recipients, [channel]) for channel in channels),
+            return_exceptions=True
+        )
+        results = {}
+        for channel, result in zip(channels, channel_results):
+            if isinstance(result, Exception):
+                logger.error(f"Error sending notification through {channel}: {str(result)}")
+                results[channel] = {"success": False, "error": str(result)}
+            else:
+                results.update(result)
         
         # Update notification with delivery status
         notification.delivery_status = json.dumps(results)
@@ -7,6 +7,7 @@ import random
 import uuid
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update, delete, and_, or_, desc
+from sqlalchemy.orm import raiseload
 
 from app.services.device_management_service import DeviceService
 from app.services.messaging_service import NotificationService
@@ -14,9 +15,14 @@ from app.services.websocket_service import publish_event
 from app.models.rule import Rule
 from app.models.sensor_reading import SensorReading
 from app.api.schemas import RuleCreate, RuleUpdate, RuleAction, RuleCondition
+from app.utils.shared_cache import shared_cache
 
 logger = logging.getLogger(__name__)
 
+# Cached rule listing response; dropped whenever a rule is written
+RULES_LIST_CACHE_KEY = "rules:list"
+RULES_LIST_CACHE_TTL = 60
+
 class RuleService:
     """Service for managing device rules"""
     
@@ -55,6 +61,7 @@ class RuleService:
             # Add to database
             self.db.add(rule)
             await self.db.commit()
+            await self._invalidate_rule_list()
             await self.db.refresh(rule)
             
             return {
@@ -154,6 +161,7 @@ class RuleService:
             
             # Save changes
             await self.db.commit()
+            await self._invalidate_rule_list()
             await self.db.refresh(rule)
             
             return {
@@ -200,6 +208,7 @@ class RuleService:
             # Delete from database
             await self.db.delete(rule)
             await self.db.commit()
+            await self._invalidate_rule_list()
             
             return {
                 "status": "success",
@@ -216,6 +225,11 @@ class RuleService:
                 "errors": [{"field": "database", "detail": str(e)}]
             }
         
+    @staticmethod
+    async def _invalidate_rule_list() -> None:
+        """Drop the cached rule listing after a rule changes"""
+        await shared_cache.delete(RULES_LIST_CACHE_KEY)
+    
     async def list_rules(self) -> Dict[str, Any]:
         """
         List all rules
@@ -224,7 +238,15 @@ class RuleService:
             Standardized response with list of rules
         """
         try:
-            query = select(Rule).order_by(Rule.priority.desc())
+            # Conditions/actions are JSON columns, so the listing is a single query;
+            # raiseload keeps any future relationship from lazy-loading per row, and
+            # populate_existing refreshes rules already held by this session after a write
+            query = (
+                select(Rule)
+                .options(raiseload("*"))
+                .order_by(Rule.priority.desc())
+                .execution_options(populate_existing=True)
+            )
             result = await self.db.execute(query)
             rules = result.scalars().all()
             
@@ -269,6 +291,7 @@ class RuleService:
             # Enable rule
             rule.is_enabled = True
             await self.db.commit()
+            await self._invalidate_rule_list()
             
             return {
                 "status": "success",
@@ -319,6 +342,7 @@ class RuleService:
             rule.is_enabled = False
             rule.updated_at = datetime.now()
             await self.db.commit()
+            await self._invalidate_rule_list()
             await self.db.refresh(rule)
             
             return {
@@ -486,6 +510,7 @@ class RuleService:
                         rule.last_triggered = datetime.fromisoformat(lt_str)
                         self.db.add(rule)
                         await self.db.commit()
+                        await self._invalidate_rule_list()
                     
                     # Publish progress update every 5 rules applied
                     if rules_applied % 5 == 0:
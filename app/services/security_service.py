@@ -45,6 +45,9 @@ from app.utils.vulnerability_utils import vulnerability_manager
 class VulnerabilityScanner:
     """Advanced vulnerability scanner for IoT devices"""
     
+    # Maximum number of devices scanned at the same time by bulk_scan
+    BULK_SCAN_CONCURRENCY = 16
+    
     def __init__(self, db: AsyncSession):
         self.db = db
         self._scan_lock = asyncio.Lock()
@@ -204,19 +207,21 @@ class VulnerabilityScanner:
             "scan_results": {}
         }
         
+        # Skip offline devices
+        online_devices = [device for device in devices if device.is_online]
+        semaphore = asyncio.Semaphore(self.BULK_SCAN_CONCURRENCY)
+        
+        async def scan_one(device: Device) -> List[Dict[str, Any]]:
+            async with semaphore:
+                # scan_device already simulates the network delay
+                return await self.scan_device(device)
+        
         # Use a lock to prevent concurrent scans that might conflict
         async with self._scan_lock:
-            for device in devices:
-                # Skip offline devices
-                if not device.is_online:
-                    continue
-                    
-                # Simulate network delay for realism
-                await simulate_network_delay(min_delay=0.1, max_delay=0.5)
-                
-                # Scan the device
-                vulnerabilities = await self.scan_device(device)
-                
+            # scan_device doesn't touch the DB session, so devices can be scanned concurrently
+            scanned = await asyncio.gather(*(scan_one(device) for device in online_devices))
+            
+            for device, vulnerabilities in zip(online_devices, scanned):
                 # Add results
                 results["devices_scanned"] += 1
                 
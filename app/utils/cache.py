@@ -0,0 +1,57 @@
+"""
+Small in-process caching helpers shared by the API and service layers
+"""
+import time
+from typing import Any, Dict, Hashable, Iterator, Optional, Tuple
+
+_MISSING = object()
+
+class TTLCache:
+    """
+    Minimal time-based cache for hot, short-lived lookups.
+    Entries expire ``ttl`` seconds after being stored; once ``maxsize`` is reached
+    the oldest entry is evicted first.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: Dict[Hashable, Tuple[float, Any]] = {}
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key, or default if missing or expired"""
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            return default
+        expires, value = entry
+        if expires < time.monotonic():
+            self._data.pop(key, None)
+            return default
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store value under key for ``ttl`` seconds (the cache default if not given)"""
+        self._data.pop(key, None)
+        if len(self._data) >= self.maxsize:
+            # Dicts keep insertion order, so the first key is the oldest entry
+            self._data.pop(next(iter(self._data)), None)
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove key from the cache and return its value if present"""
+        entry = self._data.pop(key, _MISSING)
+        return default if entry is _MISSING else entry[1]
+
+    def keys(self) -> Iterator[Hashable]:
+        """Iterate over a snapshot of the stored keys (expired entries may be included)"""
+        return iter(list(self._data))
+
+    def clear(self) -> None:
+        """Drop every cached entry"""
+        self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,84 @@
+"""
+Shared cache for precomputed responses
+
+Values are stored in Redis when REDIS_URL is configured, so every worker sees the
+same entries. Without Redis (or if the redis package is missing) each process
+falls back to its own in-memory TTLCache.
+"""
+import logging
+from typing import Optional
+
+from config import settings
+from app.utils.cache import TTLCache
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # redis is optional; fall back to the in-process cache
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+class SharedCache:
+    """Async byte cache with per-key TTLs and prefix invalidation"""
+
+    def __init__(self, url: Optional[str] = None, default_ttl: float = 60.0, maxsize: int = 1024):
+        self.default_ttl = default_ttl
+        self._local = TTLCache(ttl=default_ttl, maxsize=maxsize)
+        self._redis = None
+        if url and aioredis is not None:
+            # from_url does not connect until the first command
+            self._redis = aioredis.from_url(url)
+        elif url:
+            logger.warning("REDIS_URL is set but the redis package is not installed; using in-process cache")
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """Return the cached value for key, or None on a miss"""
+        if self._redis is None:
+            return self._local.get(key)
+        try:
+            return await self._redis.get(key)
+        except Exception as e:
+            logger.warning("Redis get failed for %s: %s", key, e)
+            return None
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        """Store value under key for ttl seconds"""
+        ttl = self.default_ttl if ttl is None else ttl
+        if self._redis is None:
+            self._local.set(key, value, ttl=ttl)
+            return
+        try:
+            await self._redis.set(key, value, ex=max(1, int(ttl)))
+        except Exception as e:
+            logger.warning("Redis set failed for %s: %s", key, e)
+
+    async def delete(self, key: str) -> None:
+        """Drop a single entry"""
+        if self._redis is None:
+            self._local.pop(key)
+            return
+        try:
+            await self._redis.delete(key)
+        except Exception as e:
+            logger.warning("Redis delete failed for %s: %s", key, e)
+
+    async def delete_prefix(self, prefix: str) -> None:
+        """Drop every entry whose key starts with prefix"""
+        if self._redis is None:
+            for key in self._local.keys():
+                if isinstance(key, str) and key.startswith(prefix):
+                    self._local.pop(key)
+            return
+        try:
+            keys = [key async for key in self._redis.scan_iter(match=f"{prefix}*")]
+            if keys:
+                await self._redis.delete(*keys)
+        except Exception as e:
+            logger.warning("Redis delete failed for %s*: %s", prefix, e)
+
+    async def close(self) -> None:
+        """Close the Redis connection pool, if any"""
+        if self._redis is not None:
+            await self._redis.aclose()
+
+shared_cache = SharedCache(settings.REDIS_URL)
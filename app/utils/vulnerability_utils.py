@@ -2,7 +2,7 @@
 Utilities for simulating vulnerability detection and remediation in IoT devices.
 This allows for a more realistic security management workflow in the simulated environment.
 """
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterable, List, Any, Optional
 from datetime import datetime, timedelta
 import json
 import os
@@ -27,6 +27,8 @@ class VulnerabilityManager:
     
     def __init__(self):
         self.vulnerability_state = self._load_vulnerability_state()
+        # Per-device firmware-fixable vulnerabilities, rebuilt lazily after each save
+        self._firmware_fixable: Optional[Dict[str, List[Dict[str, Any]]]] = None
     
     def _load_vulnerability_state(self) -> Dict[str, Any]:
         """Load the current vulnerability state from disk"""
@@ -43,6 +45,7 @@ class VulnerabilityManager:
     
     def _save_vulnerability_state(self) -> None:
         """Save the current vulnerability state to disk"""
+        self._firmware_fixable = None
         try:
             with open(VULNERABILITY_STORE_PATH, 'w') as f:
                 self.vulnerability_state["last_updated"] = datetime.utcnow().isoformat()
@@ -61,6 +64,60 @@ class VulnerabilityManager:
         """
         return self.vulnerability_state.get("devices", {}).get(device_id, {}).get("vulnerabilities", [])
     
+    def get_vulnerabilities_for_devices(self, device_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Get the current vulnerabilities for several devices in one call.
+        Devices without recorded vulnerabilities are omitted from the result.
+        """
+        devices = self.vulnerability_state.get("devices", {})
+        result = {}
+        for device_id in device_ids:
+            vulnerabilities = devices.get(device_id, {}).get("vulnerabilities")
+            if vulnerabilities:
+                result[device_id] = vulnerabilities
+        return result
+    
+    def _firmware_fixable_index(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Partition stored vulnerabilities down to the firmware-fixable ones, once per state change"""
+        if self._firmware_fixable is None:
+            index = {}
+            for device_id, entry in self.vulnerability_state.get("devices", {}).items():
+                fixable = [v for v in entry.get("vulnerabilities", []) if v.get("fix_available") == "firmware_update"]
+                if fixable:
+                    index[device_id] = fixable
+            self._firmware_fixable = index
+        return self._firmware_fixable
+    
+    def get_firmware_fixable_vulnerabilities(self, device_id: str) -> List[Dict[str, Any]]:
+        """
+        Get the vulnerabilities of a device that a firmware update would fix.
+        Returns an empty list if there are none.
+        """
+        return self._firmware_fixable_index().get(device_id, [])
+    
+    def get_firmware_fixable_for_devices(self, device_ids: Iterable[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Get firmware-fixable vulnerabilities for several devices in one call.
+        Devices without any are omitted from the result.
+        """
+        index = self._firmware_fixable_index()
+        return {device_id: index[device_id] for device_id in device_ids if device_id in index}
+    
+    def count_firmware_fixable(self, device_ids: Optional[Iterable[str]] = None) -> int:
+        """
+        Count vulnerabilities that a firmware update would fix.
+        
+        Args:
+            device_ids: Restrict the count to these devices (all tracked devices if None)
+            
+        Returns:
+            Number of vulnerabilities with fix_available == "firmware_update"
+        """
+        index = self._firmware_fixable_index()
+        if device_ids is None:
+            return sum(len(fixable) for fixable in index.values())
+        return sum(len(index.get(device_id, ())) for device_id in device_ids)
+    
     def detect_device_vulnerabilities(self, device: Device) -> List[Dict[str, Any]]:
         """
         Detect vulnerabilities for a device based on its properties.
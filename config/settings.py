@@ -28,6 +28,12 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str = os.getenv('POSTGRES_PASSWORD', '')
     POSTGRES_DB: str = os.getenv('POSTGRES_DB', '')
     POSTGRES_PORT: str = os.getenv('POSTGRES_PORT', '5432')  # Default PostgreSQL port
+    DB_POOL_SIZE: int = int(os.getenv('DB_POOL_SIZE', '20'))
+    DB_MAX_OVERFLOW: int = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+    # Per-connection prepared statement cache (0 disables it, e.g. for pgbouncer < 1.21)
+    DB_STATEMENT_CACHE_SIZE: int = int(os.getenv('DB_STATEMENT_CACHE_SIZE', '512'))
+    # Set when connecting through pgbouncer in transaction pooling mode
+    DB_PGBOUNCER: bool = os.getenv('DB_PGBOUNCER', 'false').lower() in ('1', 'true', 'yes')
     
     # Database URL
     SQLALCHEMY_DATABASE_URI: Optional[str] = None
@@ -81,9 +87,16 @@ class Settings(BaseSettings):
     DEFAULT_NOTIFICATION_EMAIL: Optional[str] = os.getenv('DEFAULT_NOTIFICATION_EMAIL', '')
     DEFAULT_NOTIFICATION_PHONE: Optional[str] = os.getenv('DEFAULT_NOTIFICATION_PHONE', '')
 
+    # Redis (optional) - shared response cache across workers
+    REDIS_URL: Optional[str] = os.getenv('REDIS_URL') or None
+
     # Server settings
     HOST: str = os.getenv('HOST', '0.0.0.0')
     PORT: str = os.getenv('PORT', '8000')
+    # Worker processes when not reloading (gunicorn reads the same WEB_CONCURRENCY variable)
+    WORKERS: int = int(os.getenv('WEB_CONCURRENCY', '1'))
+    # Threads available per worker for blocking work (SMTP/Twilio sends, sync endpoints and dependencies)
+    THREAD_POOL_SIZE: int = int(os.getenv('THREAD_POOL_SIZE', '40'))
     
     model_config = {
         'env_file': '.env',
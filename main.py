@@ -1,10 +1,13 @@
 import logging
 import os
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from anyio import to_thread
 from fastapi import FastAPI, Request
 from typing import Any  # Use for type hints
 # Exception is a built-in Python class, not from FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.exceptions import RequestValidationError
 import uvicorn
 from datetime import datetime
@@ -13,8 +16,10 @@ from docs_enhancer import custom_openapi
 from app.api.error_handlers import sqlalchemy_exception_handler, validation_exception_handler, general_exception_handler
 
 from app.api.router import api_router
+from app.api.utils import FastJSONResponse
 from app.models.database import AsyncSessionLocal, get_db
 from app.services.init_service import init_system
+from app.utils.shared_cache import shared_cache
 from config import settings
 
 # Configure logging
@@ -38,6 +43,13 @@ async def lifespan(app: FastAPI):
     # Startup tasks
     logger.info("Application starting up")
     
+    # Bound the threads used for blocking work: asyncio.to_thread runs on the loop's
+    # default executor, sync endpoints/dependencies on anyio's thread limiter
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=settings.THREAD_POOL_SIZE, thread_name_prefix="blocking")
+    )
+    to_thread.current_default_thread_limiter().total_tokens = settings.THREAD_POOL_SIZE
+    
     # Initialize system with required data
     async for db in get_db():
         await init_system(db)
@@ -60,6 +72,7 @@ async def lifespan(app: FastAPI):
     
     # Shutdown tasks
     logger.info("Application shutting down")
+    await shared_cache.close()
 
 def get_application() -> FastAPI:
     """Create and configure the FastAPI application"""
@@ -70,6 +83,8 @@ def get_application() -> FastAPI:
         docs_url="/api/docs",
         redoc_url="/api/redoc",
         openapi_url="/api/openapi.json",
+        # Every response is encoded with json_dumps (orjson when installed)
+        default_response_class=FastJSONResponse,
         lifespan=lifespan
     )
     
@@ -93,6 +108,9 @@ def get_application() -> FastAPI:
             allow_headers=settings.CORS_ALLOW_HEADERS,
         )
     
+    # Compress JSON bodies above 1 KB (group listings, dashboards); level 5 keeps CPU cost low
+    _app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+    
     # Include API router
     _app.include_router(api_router, prefix=settings.API_V1_PREFIX)
     
@@ -131,10 +149,14 @@ if __name__ == "__main__":
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", "8000"))
     
+    # uvicorn picks uvloop and httptools automatically when they are installed.
+    # In production this can also run under gunicorn:
+    #   gunicorn main:app -k uvicorn.workers.UvicornWorker -w $WEB_CONCURRENCY --worker-connections 1000
     logger.info(f"Starting server on {host}:{port}")
     uvicorn.run(
         "main:app",
         host=host, 
         port=port,
-        reload=settings.DEBUG
+        reload=settings.DEBUG,
+        workers=None if settings.DEBUG else settings.WORKERS
     ) 
\ No newline at end of file
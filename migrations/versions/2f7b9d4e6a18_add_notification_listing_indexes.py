@@ -0,0 +1,45 @@
+"""Add composite indexes backing the notification listings
+
+Revision ID: 2f7b9d4e6a18
+Revises: 7a5c3e9b1d64
+Create Date: 2026-10-15 23:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2f7b9d4e6a18'
+down_revision: Union[str, None] = '7a5c3e9b1d64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+NOTIFICATION_INDEXES = {
+    'ix_notif_unread_created': ('is_read',),
+    'ix_notif_type_created': ('notification_type',),
+    'ix_notif_source_created_at': ('source', 'source_id'),
+}
+
+
+def upgrade() -> None:
+    """Index the filter columns together with created_at DESC."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        for name, columns in NOTIFICATION_INDEXES.items():
+            op.create_index(
+                name,
+                'notifications',
+                [*columns, sa.text('created_at DESC')],
+                unique=False,
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    """Drop the notification listing indexes."""
+    with op.get_context().autocommit_block():
+        for name in NOTIFICATION_INDEXES:
+            op.drop_index(name, table_name='notifications', postgresql_concurrently=True)
@@ -0,0 +1,38 @@
+"""Add composite (device_type, release_date DESC) index on firmware
+
+Revision ID: 3c9e1f7a2b40
+Revises: f999_activity_target_id_varchar
+Create Date: 2026-10-15 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9e1f7a2b40'
+down_revision: Union[str, None] = 'f999_activity_target_id_varchar'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Cover "latest firmware per device type" lookups with an index-only scan."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_firmware_type_release',
+            'firmware',
+            ['device_type', sa.text('release_date DESC')],
+            unique=False,
+            postgresql_include=['version', 'is_critical', 'id'],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Drop the composite firmware index."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_firmware_type_release', table_name='firmware', postgresql_concurrently=True)
@@ -0,0 +1,64 @@
+"""Add network_security_summary materialized view
+
+Revision ID: 4e8a1c7d3b52
+Revises: 9d4f2a6c8e15
+Create Date: 2026-10-15 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4e8a1c7d3b52'
+down_revision: Union[str, None] = '9d4f2a6c8e15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Pre-aggregate the fleet-wide counts shown by the network security summary."""
+    # Single row; refreshed_at lets the API decide when the view is stale. Every scan
+    # appends a full set of findings, so only each device's latest completed
+    # vulnerability scan is counted, keeping the figures at the fleet's current state
+    op.execute("""
+        CREATE MATERIALIZED VIEW network_security_summary AS
+        SELECT
+            1 AS id,
+            d.device_count,
+            v.total_vulnerabilities,
+            v.critical,
+            v.high,
+            v.medium,
+            v.low,
+            now() AT TIME ZONE 'utc' AS refreshed_at
+        FROM (
+            SELECT count(*) AS device_count FROM devices
+        ) d
+        CROSS JOIN (
+            SELECT
+                count(*) AS total_vulnerabilities,
+                count(*) FILTER (WHERE lower(vs.severity) = 'critical') AS critical,
+                count(*) FILTER (WHERE lower(vs.severity) = 'high') AS high,
+                count(*) FILTER (WHERE lower(vs.severity) = 'medium') AS medium,
+                count(*) FILTER (WHERE lower(vs.severity) = 'low') AS low
+            FROM vulnerability_scans vs
+            JOIN (
+                SELECT DISTINCT ON (device_id) id
+                FROM scans
+                WHERE scan_type = 'vulnerability'
+                  AND status = 'completed'
+                  AND device_id IS NOT NULL
+                ORDER BY device_id, end_time DESC NULLS LAST
+            ) latest ON latest.id = vs.scan_id
+            WHERE vs.vulnerability_id IS NOT NULL
+        ) v
+    """)
+    # A unique index is required for REFRESH MATERIALIZED VIEW CONCURRENTLY
+    op.execute("CREATE UNIQUE INDEX ix_network_security_summary_id ON network_security_summary (id)")
+
+
+def downgrade() -> None:
+    """Drop the summary materialized view."""
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS network_security_summary")
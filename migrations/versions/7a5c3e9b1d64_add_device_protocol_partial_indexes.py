@@ -0,0 +1,42 @@
+"""Add partial indexes on the devices protocol support flags
+
+Revision ID: 7a5c3e9b1d64
+Revises: 4e8a1c7d3b52
+Create Date: 2026-10-15 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a5c3e9b1d64'
+down_revision: Union[str, None] = '4e8a1c7d3b52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PROTOCOL_FLAGS = ('supports_http', 'supports_mqtt', 'supports_coap', 'supports_websocket')
+
+
+def upgrade() -> None:
+    """Let the per-protocol device counts run as index-only scans."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        for flag in PROTOCOL_FLAGS:
+            op.create_index(
+                f'ix_devices_{flag}',
+                'devices',
+                [flag],
+                unique=False,
+                postgresql_where=sa.text(flag),
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    """Drop the protocol partial indexes."""
+    with op.get_context().autocommit_block():
+        for flag in PROTOCOL_FLAGS:
+            op.drop_index(f'ix_devices_{flag}', table_name='devices', postgresql_concurrently=True)
@@ -0,0 +1,60 @@
+"""Add denormalized groups.device_count maintained by triggers
+
+Revision ID: 9d4f2a6c8e15
+Revises: 3c9e1f7a2b40
+Create Date: 2026-10-15 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4f2a6c8e15'
+down_revision: Union[str, None] = '3c9e1f7a2b40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add groups.device_count and keep it in sync with device_groups."""
+    op.add_column('groups', sa.Column('device_count', sa.Integer(), nullable=False, server_default='0'))
+
+    # Backfill existing memberships
+    op.execute("""
+        UPDATE groups g
+        SET device_count = s.device_count
+        FROM (
+            SELECT group_id, count(*) AS device_count
+            FROM device_groups
+            GROUP BY group_id
+        ) s
+        WHERE s.group_id = g.id
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION groups_device_count_sync() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                UPDATE groups SET device_count = device_count + 1 WHERE id = NEW.group_id;
+            ELSE
+                UPDATE groups SET device_count = device_count - 1 WHERE id = OLD.group_id;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER trg_device_groups_count
+        AFTER INSERT OR DELETE ON device_groups
+        FOR EACH ROW EXECUTE FUNCTION groups_device_count_sync()
+    """)
+
+
+def downgrade() -> None:
+    """Drop the device_count triggers and column."""
+    op.execute("DROP TRIGGER IF EXISTS trg_device_groups_count ON device_groups")
+    op.execute("DROP FUNCTION IF EXISTS groups_device_count_sync()")
+    op.drop_column('groups', 'device_count')